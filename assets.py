@@ -1,4 +1,5 @@
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 assets_dir_entries = [
@@ -12,6 +13,7 @@ if hasattr(sys, '_MEIPASS'):
     assets_dir_entries.append(Path(getattr(sys, '_MEIPASS')) / "assets")
 
 
+@lru_cache(maxsize=None)  # 素材目录在运行期间不会变化，只探测一次
 def get_assets_dir() -> Path:
     for entry in assets_dir_entries:
         flagfile = entry / "_assets_dir_flag"
@@ -0,0 +1,108 @@
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple
+
+from loguru import logger
+from PySide2.QtCore import QObject, QUrl
+from PySide2.QtGui import QGuiApplication
+
+import conf
+
+BELLS = ('attend_class', 'finish_class')  # AudioConfig 中的铃声
+HEADLESS_PLATFORMS = ('offscreen', 'minimal')
+LATENCY_HISTORY = 32  # 保留最近多少次播放的延迟
+
+
+class AudioSink(QObject):
+    """
+    铃声输出。默认实现不发声（无头环境、没有可用的音频后端），只记录每次播放及其延迟；
+    ``SoundEffectSink`` 在启动时把铃声解码一次并保持输出设备打开，响铃时直接播放内存中的样本。
+    """
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self.sounds: 'Dict[str, Path]' = {}
+        self.latencies: 'Deque[Tuple[str, float]]' = deque(maxlen=LATENCY_HISTORY)  # (铃声, 秒)
+
+    def load(self, sounds: 'Dict[str, Path]'):
+        self.sounds = dict(sounds)
+
+    def play(self, name: str, due: Optional[float] = None):
+        """``due`` 为铃声计划响起的时刻（time.time()），用于计算实际开始播放的延迟"""
+        self._started(name, due)
+
+    def _started(self, name: str, due: Optional[float]):
+        if due is None:
+            return
+        latency = time.time() - due
+        self.latencies.append((name, latency))
+        logger.info(f'Bell {name} started {latency * 1000:.0f} ms after the transition')
+
+
+class SoundEffectSink(AudioSink):
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        from PySide2.QtMultimedia import QSoundEffect  # 依赖系统音频库（如 libpulse），可能无法导入
+        self._effect_type = QSoundEffect
+        self._effects: 'Dict[str, QSoundEffect]' = {}
+        self._due: 'Dict[str, Optional[float]]' = {}
+
+    def load(self, sounds):
+        super().load(sounds)
+        for name, path in sounds.items():
+            effect = self._effects.get(name)
+            if effect is None:
+                effect = self._effects[name] = self._effect_type(self)
+                effect.playingChanged.connect(lambda name=name: self._on_playing_changed(name))
+                effect.statusChanged.connect(lambda name=name: self._on_status_changed(name))
+            effect.setSource(QUrl.fromLocalFile(str(path)))  # 异步解码，之后每次播放复用同一份样本
+
+    def play(self, name, due=None):
+        effect = self._effects.get(name)
+        if effect is None:
+            logger.warning(f'Unknown bell: {name}')
+            return
+        self._due[name] = due
+        effect.stop()
+        effect.play()
+
+    def _on_playing_changed(self, name: str):
+        if self._effects[name].isPlaying() and name in self._due:
+            self._started(name, self._due.pop(name))
+
+    def _on_status_changed(self, name: str):
+        if self._effects[name].status() == self._effect_type.Error:
+            logger.error(f'无法加载铃声 {name}：{self.sounds.get(name)}')
+
+
+def create_sink(parent: 'QObject | None' = None) -> AudioSink:
+    if QGuiApplication.platformName() in HEADLESS_PLATFORMS:
+        return AudioSink(parent)
+    try:
+        return SoundEffectSink(parent)
+    except Exception as e:
+        logger.warning(f'无法初始化音频输出，铃声将不会播放：{e}')
+        return AudioSink(parent)
+
+
+_sink: Optional[AudioSink] = None
+
+
+def get_sink() -> AudioSink:
+    """首次调用时创建音频输出并加载铃声"""
+    global _sink
+    if _sink is None:
+        _sink = create_sink()
+        load_bells()
+    return _sink
+
+
+def load_bells():
+    """按配置（重新）加载铃声文件；启动时与 audio 配置变化后调用"""
+    get_sink().load({name: getattr(conf.CFG.audio, name) for name in BELLS})
+
+
+def play(name: str, due: Optional[float] = None):
+    get_sink().play(name, due)
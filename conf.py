@@ -1,9 +1,10 @@
 import configparser
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 
 from loguru import logger
 from pydantic import BaseModel, FilePath, ValidationError
+from typing_extensions import Literal
 
 from globals import AUDIO_DEFAULT_DIR, CONFIG_PATH_INI, CONFIG_PATH_JSON
 
@@ -18,12 +19,25 @@ class GeneralConfig(BaseModel):
     auto_hide: bool = False
     enable_toast: bool = False
     enable_alt_schedule: bool = False
+    bell_catch_up: int = 120  # seconds; a bell delayed longer than this (suspend, stall) is skipped
+    icon_disk_cache: bool = True  # persist rasterized subject icons under cache/icons
+    live_blur: bool = False  # blur the current-activity background live instead of showing a cached pre-blurred pixmap
+    idle_mode: bool = True  # slow the clock down while no period is running
+    idle_lead: int = 10  # minutes; full-rate updates resume this long before the next period starts
+    idle_interval: int = 60  # seconds between updates while idle, 0 = update only at transitions
+    idle_hide_seconds: bool = True  # show whole minutes instead of seconds while idle
+    single_window: bool = False  # lay out all widgets as panels of one overlay window
+    window_policy: Literal["keep", "destroy"] = "keep"  # settings / exact-menu windows on close: "keep" hides and reuses them, "destroy" frees them
 
 
 class DateConfig(BaseModel):
     start_date: Optional[str] = None
     cd_text_custom: str = ""
     countdown_date: Optional[str] = None
+    end_date: Optional[str] = None  # semester end, defaults to start_date + 26 weeks
+    holidays: List[str] = []  # "YYYY-MM-DD" or "YYYY-MM-DD~YYYY-MM-DD"
+    exam_days: List[str] = []  # same format as holidays
+    makeup_days: Dict[str, int] = {}  # "YYYY-MM-DD" -> weekday (0 = Monday) whose schedule is followed
 
 
 class AudioConfig(BaseModel):
@@ -31,9 +45,18 @@ class AudioConfig(BaseModel):
     finish_class: FilePath = AUDIO_DEFAULT_DIR / "finish_class.wav"
 
 
+class ScheduleOverlay(BaseModel):
+    # temporary lesson swaps, applied in memory on top of the profile; the profile file itself is never rewritten
+    profile: str
+    expires: Optional[str] = None  # "YYYY-MM-DD", last day the overlay applies
+    schedule: Dict[str, List[str]] = {}  # weekday -> lessons, replaces that day of the profile
+    schedule_even: Dict[str, List[str]] = {}
+
+
 class TempConfig(BaseModel):
     set_week: Optional[str] = None
-    temp_schedule: Optional[str] = None
+    temp_schedule: Optional[str] = None  # legacy: profile overwritten by a swap, restored from backup.json
+    overlay: Optional[ScheduleOverlay] = None
     hide: bool = False
 
 
@@ -1,7 +1,6 @@
 import datetime as dt
-import shutil
 import sys
-from typing import Type, cast
+from typing import Mapping, Type, cast
 
 from loguru import logger
 from PySide2.QtCore import Qt, SignalInstance
@@ -9,19 +8,18 @@ from PySide2.QtGui import QIcon
 from PySide2.QtWidgets import QApplication
 from qfluentwidgets import ComboBox
 from qfluentwidgets import FluentIcon as fIcon
-from qfluentwidgets import (FluentWindow, Flyout, FlyoutAnimationType, HyperlinkButton, InfoBarIcon, LineEdit, ListWidget, PrimaryPushButton, Theme,
-                            ToolButton, setTheme)
+from qfluentwidgets import (FluentWindow, Flyout, FlyoutAnimationType, HyperlinkButton, InfoBarIcon, LineEdit, ListWidget, PrimaryPushButton,
+                            PushButton, Theme, ToolButton, setTheme)
 from typing_extensions import TypeVar
 
 import conf
-import menu
+import lifecycle
+import menu  # 注册设置窗口（lifecycle 'settings'）
 import presets
+import timetable
 from assets import get_img_dir
-from globals import APP_NAME, CONFIG_DIR
-from utils import WeekType, create_from_ui, get_week_type, read_schedule_config
-
-current_week = dt.datetime.today().weekday()
-temp_schedule = {'schedule': {}, 'schedule_even': {}}
+from globals import APP_NAME
+from utils import WeekType, create_from_ui, get_schedule_overlay, get_week_type, read_effective_schedule
 
 T = TypeVar('T')
 
@@ -33,17 +31,17 @@ class ExactMenu(FluentWindow):
 
     def __init__(self):
         super().__init__()
-        self.menu = None
+        self.temp_schedule: 'dict[str, dict[str, list[str]]]' = {'schedule': {}, 'schedule_even': {}}  # 本次编辑的换课
+        self.filename: 'str | None' = None  # set by load_schedule()
         self.interface = create_from_ui('exact_menu.ui', parent=self)
         self.initUI()
         self.init_interface()
 
-        self.filename: 'str | None' = None
-
     def init_interface(self):
         select_temp_week = self.findChild(ComboBox, 'select_temp_week')  # 选择替换日期
         select_temp_week.addItems(presets.week)
-        select_temp_week.setCurrentIndex(current_week)
+        temp_week = conf.CFG.temp.set_week
+        select_temp_week.setCurrentIndex(int(temp_week) if temp_week else dt.date.today().weekday())
         cast(SignalInstance, select_temp_week.currentIndexChanged).connect(self.refresh_schedule_list)  # 日期选择变化
 
         tmp_schedule_list = self.findChild(ListWidget, 'schedule_list')  # 换课列表
@@ -60,61 +58,68 @@ class ExactMenu(FluentWindow):
         save_temp_conf = self.findChild(PrimaryPushButton, 'save_temp_conf')  # 保存设置
         save_temp_conf.clicked.connect(self.save_temp_conf)
 
+        revert_temp_conf = PushButton('撤销换课', self.interface)  # 立即恢复原课表
+        revert_temp_conf.setObjectName('revert_temp_conf')
+        layout = self.interface.horizontalLayout_4
+        layout.insertWidget(layout.indexOf(save_temp_conf), revert_temp_conf)
+        revert_temp_conf.clicked.connect(self.revert_temp_conf)
+
         redirect_to_settings = self.findChild(HyperlinkButton, 'redirect_to_settings')
         redirect_to_settings.clicked.connect(self.open_settings)
 
     def open_settings(self):
-        if self.menu is None or not self.menu.isVisible():  # 防多开
-            self.menu = menu.desktop_widget()
-            self.menu.show()
-        else:
-            self.menu.raise_()
-            self.menu.activateWindow()
+        lifecycle.open_window('settings')
 
-    def load_schedule(self):
-        if not conf.CFG.temp.temp_schedule:
-            filename = conf.CFG.general.schedule
-            if filename is None:
-                raise FileNotFoundError(f"Failed to find schedule file {repr(filename)}")
-        else:
-            filename = 'backup.json'
+    def refresh(self):  # 重新打开时丢弃未保存的换课，按最新的课表重新加载
+        self.temp_schedule = {'schedule': {}, 'schedule_even': {}}
+        self.filename = conf.CFG.general.schedule
+        self.refresh_schedule_list()
 
-        assert filename is not None
+    def selected_week(self) -> int:
+        return self.findChild(ComboBox, 'select_temp_week').currentIndex()
+
+    def load_schedule(self):
+        filename = conf.CFG.general.schedule
+        if filename is None:
+            raise FileNotFoundError(f"Failed to find schedule file {repr(filename)}")
         self.filename = filename
 
-        # data = conf.load_from_json(filename)
-        data = read_schedule_config(filename)
+        # 课表叠加已保存的临时换课
+        data = read_effective_schedule(filename)
 
         if data is None:
             # file not found / format error
             raise RuntimeError(f"Failed to load schedule file: {filename}")
 
-        elif not isinstance(data, dict):
+        elif not isinstance(data, Mapping):
             # file format error
             raise ValueError(f"Invalid schedule file format: {filename}; excepted a dict, got {type(data)}")
 
         if get_week_type() == WeekType.DOUBLE:
-            return data['schedule_even'][str(current_week)]
+            return data['schedule_even'][str(self.selected_week())]
         else:
-            return data['schedule'][str(current_week)]
+            return data['schedule'][str(self.selected_week())]
 
     def save_temp_conf(self):
         assert self.filename is not None
         filename = self.filename
         try:
-            temp_week = self.findChild(ComboBox, 'select_temp_week')
-            if temp_schedule != {'schedule': {}, 'schedule_even': {}}:
-                if conf.CFG.temp.temp_schedule:
-                    shutil.copy(CONFIG_DIR / 'schedule' / filename, CONFIG_DIR / 'schedule' / 'backup.json')
-                    logger.info(f'Made backup of schedule config: {filename} -> backup.json')
-                conf.CFG.temp.temp_schedule = filename
-                conf.save()
-
-            conf.CFG.temp.set_week = str(temp_week.currentIndex())
+            if self.temp_schedule != {'schedule': {}, 'schedule_even': {}}:
+                # 换课只记录在配置的覆盖层中，当天有效，不改写课表文件
+                overlay = get_schedule_overlay(filename) or conf.ScheduleOverlay(profile=filename)
+                conf.CFG.temp.overlay = conf.ScheduleOverlay(
+                    profile=filename,
+                    expires=dt.date.today().isoformat(),
+                    schedule={**overlay.schedule, **self.temp_schedule['schedule']},
+                    schedule_even={**overlay.schedule_even, **self.temp_schedule['schedule_even']},
+                )
+                logger.info(f'Saved temporary schedule overlay for {filename}')
+
+            conf.CFG.temp.set_week = str(self.selected_week())
             conf.save()
             Flyout.create(icon=InfoBarIcon.SUCCESS,
                           title='保存成功',
-                          content=f"已保存至 ./config.ini \n重启后失效。",
+                          content=f"已保存至 ./config.json \n当天有效，次日自动恢复。",
                           target=self.findChild(PrimaryPushButton, 'save_temp_conf'),
                           parent=self,
                           isClosable=True,
@@ -128,21 +133,42 @@ class ExactMenu(FluentWindow):
                           isClosable=True,
                           aniType=FlyoutAnimationType.PULL_UP)
 
+    def revert_temp_conf(self):
+        target = self.findChild(PushButton, 'revert_temp_conf')
+        try:
+            timetable.revert_overlay()
+            self.temp_schedule = {'schedule': {}, 'schedule_even': {}}
+            self.refresh_schedule_list()
+            Flyout.create(icon=InfoBarIcon.SUCCESS,
+                          title='已撤销',
+                          content="临时换课已清除，已恢复原课表。",
+                          target=target,
+                          parent=self,
+                          isClosable=True,
+                          aniType=FlyoutAnimationType.PULL_UP)
+        except Exception as e:
+            Flyout.create(icon=InfoBarIcon.ERROR,
+                          title='撤销失败',
+                          content=f"错误信息：{e}",
+                          target=target,
+                          parent=self,
+                          isClosable=True,
+                          aniType=FlyoutAnimationType.PULL_UP)
+
     def refresh_schedule_list(self):
-        current_week = self.findChild(ComboBox, 'select_temp_week').currentIndex()
+        current_week = self.selected_week()
         tmp_schedule_list = self.findChild(ListWidget, 'schedule_list')  # 换课列表
         tmp_schedule_list.clear()
 
         assert self.filename is not None
         filename = self.filename
 
-        # data = conf.load_from_json(filename)
-        data = read_schedule_config(filename)
+        data = read_effective_schedule(filename)
         if data is None:
             # file not found / format error
             raise RuntimeError(f"Failed to load schedule list file: {filename}")
 
-        elif not isinstance(data, dict):
+        elif not isinstance(data, Mapping):
             # file format error
             raise ValueError(f"Invalid schedule file format: {filename}; excepted a dict, got {type(data)}")
 
@@ -152,7 +178,6 @@ class ExactMenu(FluentWindow):
             tmp_schedule_list.addItems(data['schedule'][str(current_week)])
 
     def upload_item(self):
-        global temp_schedule
         se_schedule_list = self.findChild(ListWidget, 'schedule_list')
         cache_list = []
         for i in range(se_schedule_list.count()):  # 缓存ListWidget数据至列表
@@ -165,9 +190,9 @@ class ExactMenu(FluentWindow):
             cache_list.append(item_text)
 
         if get_week_type():
-            temp_schedule['schedule_even'][str(current_week)] = cache_list
+            self.temp_schedule['schedule_even'][str(self.selected_week())] = cache_list
         else:
-            temp_schedule['schedule'][str(current_week)] = cache_list
+            self.temp_schedule['schedule'][str(self.selected_week())] = cache_list
 
     def edit_item(self):
         tmp_schedule_list = self.findChild(ListWidget, 'schedule_list')
@@ -207,6 +232,9 @@ class ExactMenu(FluentWindow):
         self.hide()
 
 
+lifecycle.register('exact_menu', ExactMenu)
+
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     if sys.platform == 'win32' and sys.getwindowsversion().build >= 22000:
@@ -6,6 +6,7 @@ from typing_extensions import TypeAlias
 AUDIO_DEFAULT_DIR = Path.cwd() / "audio"
 
 CONFIG_DIR = Path.cwd() / "config"
+CACHE_DIR = Path.cwd() / "cache"
 CONFIG_PATH_INI = Path("config.ini")
 CONFIG_PATH_JSON = Path("config.json")
 
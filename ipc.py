@@ -0,0 +1,90 @@
+import os
+import sys
+from typing import List
+
+from loguru import logger
+from PySide2.QtCore import QObject, QProcess
+from PySide2.QtCore import Signal as pyqtSignal
+from PySide2.QtNetwork import QLocalServer, QLocalSocket
+
+from globals import APP_NAME
+
+SETTINGS_SERVER = f'{APP_NAME}-settings'  # 设置进程监听的本地套接字
+CONNECT_TIMEOUT = 500  # 毫秒
+
+
+class MessageServer(QObject):
+    """本地套接字服务端：每个连接发送一行 UTF-8 文本命令，如 ``open settings``"""
+    messageReceived = pyqtSignal(str)
+
+    def __init__(self, name: str, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self.name = name
+        self._server = QLocalServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+
+    def listen(self) -> bool:
+        """开始监听；名字已被另一个仍在运行的进程占用时返回 False"""
+        if not self._server.listen(self.name):
+            if is_listening(self.name):
+                logger.debug(f'{self.name} is already served by another process')
+                return False
+            # 上一个进程异常退出时可能留下套接字文件（Unix）
+            QLocalServer.removeServer(self.name)
+            if not self._server.listen(self.name):
+                logger.error(f'Failed to listen on {self.name}: {self._server.errorString()}')
+                return False
+        return True
+
+    def close(self):
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read(self, socket: QLocalSocket):
+        while socket.canReadLine():
+            message = bytes(socket.readLine()).decode('utf-8').strip()
+            if message:
+                logger.debug(f'{self.name} received: {message}')
+                self.messageReceived.emit(message)
+
+
+def is_listening(name: str, timeout: int = CONNECT_TIMEOUT) -> bool:
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+
+def send(name: str, message: str, timeout: int = CONNECT_TIMEOUT) -> bool:
+    """向本地套接字 ``name`` 发送一条命令；没有进程在监听时返回 False"""
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout):
+        return False
+    socket.write(f'{message}\n'.encode('utf-8'))
+    socket.waitForBytesWritten(timeout)
+    socket.disconnectFromServer()
+    return True
+
+
+def settings_command(window: str) -> 'List[str]':
+    """启动设置进程的命令行（打包后的可执行文件直接带参数运行）"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, '--settings', window]
+    return [sys.executable, os.path.abspath(sys.argv[0]), '--settings', window]
+
+
+def open_settings_window(window: str = 'settings'):
+    """在设置进程中打开窗口（settings / exact_menu）；设置进程未运行时启动它"""
+    if send(SETTINGS_SERVER, f'open {window}'):
+        return
+    program, *args = settings_command(window)
+    if not QProcess.startDetached(program, args):
+        logger.error(f'无法启动设置进程：{program} {" ".join(args)}')
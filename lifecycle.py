@@ -0,0 +1,92 @@
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+from PySide2.QtCore import QEvent, QObject
+from PySide2.QtCore import Signal as pyqtSignal
+from PySide2.QtWidgets import QApplication, QWidget
+
+import conf
+
+KEEP = 'keep'  # 关闭时只隐藏，再次打开时复用同一实例并刷新数据
+DESTROY = 'destroy'  # 关闭时释放窗口，再次打开时重新创建
+
+
+class ManagedWindow(QObject):
+    """
+    可反复打开的窗口（设置、更多功能）：同一时间只有一个实例，关闭后按 ``general.window_policy`` 保留或释放。
+    保留的窗口再次打开前会调用其 ``refresh()``（如果有）。
+    """
+    closed = pyqtSignal()
+
+    def __init__(self, name: str, factory: 'Callable[[], QWidget]', parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self.name = name
+        self.factory = factory
+        self.window: Optional[QWidget] = None
+        self._released: 'List[QWidget]' = []  # 等待 deleteLater 的窗口，需保持引用直到真正删除
+
+    def open(self) -> QWidget:
+        window = self.window
+        if window is not None and window.isVisible():  # 防多开
+            window.raise_()
+            window.activateWindow()
+            return window
+        if window is None:
+            window = self.window = self.factory()
+            window.installEventFilter(self)
+            logger.debug(f'Created {self.name} window')
+        elif hasattr(window, 'refresh'):
+            window.refresh()
+        window.show()
+        return window
+
+    def release(self):
+        window, self.window = self.window, None
+        if window is None:
+            return
+        window.removeEventFilter(self)
+        self._released.append(window)
+        window.destroyed.connect(lambda: self._released.remove(window))
+        window.deleteLater()
+        logger.debug(f'Released {self.name} window')
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        # 窗口自己的 closeEvent 只会隐藏窗口；按策略决定是否随后释放
+        if watched is self.window and event.type() == QEvent.Close:
+            if conf.CFG.general.window_policy == DESTROY:
+                self.release()
+            self.closed.emit()
+        return False
+
+
+WINDOWS: 'Dict[str, ManagedWindow]' = {}
+
+
+def register(name: str, factory: 'Callable[[], QWidget]') -> ManagedWindow:
+    WINDOWS[name] = ManagedWindow(name, factory)
+    return WINDOWS[name]
+
+
+def open_window(name: str) -> QWidget:
+    return WINDOWS[name].open()
+
+
+def any_visible() -> bool:
+    return any(w.window is not None and w.window.isVisible() for w in WINDOWS.values())
+
+
+def object_counts() -> 'Dict[str, int]':
+    """当前的顶层窗口数与 QObject 数（从 QApplication 及各顶层窗口可达的对象），用于确认长时间运行后没有泄漏"""
+    app = QApplication.instance()
+    windows = QApplication.topLevelWidgets()
+    objects = len(app.findChildren(QObject)) + sum(1 + len(w.findChildren(QObject)) for w in windows)
+    return {
+        'windows': len(windows),
+        'visible_windows': sum(w.isVisible() for w in windows),
+        'objects': objects,
+    }
+
+
+def log_object_counts():
+    counts = object_counts()
+    logger.info(f'Top-level windows: {counts["windows"]} ({counts["visible_windows"]} visible), QObjects: {counts["objects"]}')
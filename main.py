@@ -1,326 +1,54 @@
+import argparse
 import datetime as dt
+import enum
+import os
 import signal
+import time
 import sys
 from pathlib import Path
 from shutil import copy
-from typing import Type
+from typing import Any, Type
 from xml.dom.minidom import Attr
 
 import qfluentwidgets
 from loguru import logger
-from PySide2.QtCore import QByteArray, QDateTime, QEasingCurve, QPropertyAnimation, QRect, Qt, QTimer
-from PySide2.QtGui import QFont, QFontDatabase, QIcon, QShowEvent
-from PySide2.QtWidgets import (QApplication, QGraphicsBlurEffect, QGraphicsDropShadowEffect, QLabel, QMenu, QProgressBar, QPushButton, QSystemTrayIcon,
+from PySide2.QtCore import QByteArray, QDateTime, QEasingCurve, QEvent, QPoint, QPropertyAnimation, QRect, QSize, Qt, QTimer
+from PySide2.QtGui import QFont, QFontDatabase, QHideEvent, QIcon, QPainter, QPixmap, QRegion, QShowEvent
+from PySide2.QtWidgets import (QApplication, QGraphicsDropShadowEffect, QLabel, QMenu, QProgressBar, QSystemTrayIcon,
                                QVBoxLayout, QWidget)
-from qfluentwidgets import Action, FluentTranslator, SystemTrayMenu, Theme, setTheme, setThemeColor
+# 组件界面（进度条）、主题、托盘菜单与通知都依赖 qfluentwidgets；只有设置界面的页面模块留给设置进程加载
+from qfluentwidgets import Action, FluentTranslator, ProgressBar, SystemTrayMenu, Theme, setTheme, setThemeColor
 from typing_extensions import TypeVar
 
+import audio
 import conf
-import exact_menu
-import menu
+import ipc
+import lifecycle
 import presets
+import session
+import timetable
 import tip_toast
+import widgets
+from scheduler import Change, ScheduleClock, ScheduleSnapshot, TransitionScheduler, make_snapshot
+from watcher import ConfigWatcher
 from assets import get_assets_dir, get_img_dir
 from globals import APP_NAME, CONFIG_DIR
-from utils import WeekType, calculate_countdown_from_config, create_from_ui, get_time_offset, get_week_type, is_temp_week, load_ui, read_schedule_config
-
-today = dt.date.today()
-filename = conf.CFG.general.schedule
+from utils import create_from_ui, get_schedule_overlay, load_ui
 
 # 存储窗口对象
 windows = []
 
-current_state = '课程表未加载'
-current_time = dt.datetime.now().strftime('%H:%M:%S')
-current_week = dt.datetime.now().weekday()
-current_lessons = {}
-
-timeline_data = {}
-next_lessons = []
-
-bkg_opacity = 165  # 模糊label的透明度(0~255)
-time_offset = 0  # 时差偏移
-
 logger.add("log/Schedo-{time}.log", rotation="10 MB", encoding="utf-8", retention="2 days")
 
 
-# 获取课程上下午开始时间
-def get_start_time():
-    global morning_st, afternoon_st, timeline_data
-    morning_st = None
-    afternoon_st = None
-    loaded_data = read_schedule_config(filename)
-    if loaded_data is None:
-        logger.error('加载课程表文件失败: 不符合 JSON 格式规范或文件不存在')
-        return
-
-    if not isinstance(loaded_data, dict):
-        logger.error('课程表文件格式错误：JSON 根对象应当是一个字典')
-        return
-
-    timeline = loaded_data.get('timeline')
-
-    if timeline is None:
-        logger.error('课程表文件格式错误：缺少 timeline 字段')
-        return
-
-    for item_name, item_time in timeline.items():
-        try:
-            if item_name == 'start_time_m':
-                if timeline[item_name]:
-                    h, m = timeline[item_name]
-                    morning_st = dt.datetime.combine(today, dt.time(h, m))
-            elif item_name == 'start_time_a':
-                if timeline[item_name]:
-                    h, m = timeline[item_name]
-                    afternoon_st = dt.datetime.combine(today, dt.time(h, m))
-            else:
-                timeline_data[item_name] = item_time
-        except Exception as e:
-            logger.error(f'加载课程表文件[起始时间]出错：{e}')
-
-
-# 获取当前活动
-def get_current_lessons():  # 获取今日课程
-    global current_lessons
-    loaded_data = read_schedule_config(filename)
-
-    if loaded_data is None:
-        logger.error('加载课程表文件失败: 不符合 JSON 格式规范或文件不存在')
-        return
-
-    if not isinstance(loaded_data, dict):
-        logger.error('课程表文件格式错误：JSON 根对象应当是一个字典')
-        return
+T = TypeVar("T")
 
-    timeline = loaded_data.get('timeline')
 
-    if timeline is None:
-        logger.error('课程表文件格式错误：缺少 timeline 字段')
-        return
-
-    if not isinstance(timeline, dict):
-        logger.error('课程表文件格式错误：timeline 字段应当是一个字典')
-        return
-
-    if conf.CFG.general.enable_alt_schedule:
-        try:
-            # if conf.get_week_type():
-            if get_week_type() == WeekType.DOUBLE:
-                schedule = loaded_data.get('schedule_even')
-                if schedule is None:
-                    logger.error('课程表文件格式错误：缺少 schedule_even 字段（双周）')
-            else:
-                schedule = loaded_data.get('schedule')
-                if schedule is None:
-                    logger.error('课程表文件格式错误：缺少 schedule 字段（单周）')
-        except Exception as e:
-            logger.error(f'加载课程表文件[单双周]出错：{e}')
-            schedule = loaded_data.get('schedule')
-            if schedule is None:
-                logger.error('课程表文件格式错误：缺少 schedule 字段（单周）')
-    else:
-        # logger.debug('获取单周课程')
-        schedule = loaded_data.get('schedule')
-        if schedule is None:
-            logger.error('课程表文件格式错误：缺少 schedule 字段（单周）')
-
-    if schedule is None:
-        raise RuntimeError('课程表文件格式错误：字段缺少或有误')
-
-    class_count = 0
-    for item_name, item_time in timeline.items():
-        if item_name.startswith('am') or item_name.startswith('aa'):
-            if schedule[str(current_week)]:
-                try:
-                    if schedule[str(current_week)][class_count] != '未添加':
-                        current_lessons[item_name] = schedule[str(current_week)][class_count]
-                    else:
-                        current_lessons[item_name] = '暂无课程'
-                except IndexError:
-                    current_lessons[item_name] = '暂无课程'
-                except Exception as e:
-                    current_lessons[item_name] = '暂无课程'
-                    logger.debug(f'加载课程表文件出错：{e}')
-                class_count += 1
-            else:
-                current_lessons[item_name] = '暂无课程'
-                class_count += 1
-
-
-# 获取倒计时、弹窗提示
-def get_countdown(toast=False):
-    current_dt = dt.datetime.combine(today, dt.datetime.strptime(current_time, '%H:%M:%S').time())  # 当前时间
-    return_text = []
-    if afternoon_st is not None and current_dt > afternoon_st - dt.timedelta(minutes=30):
-        c_time = afternoon_st + dt.timedelta(seconds=time_offset)  # 开始时间段
-        if current_dt == c_time and toast:
-            tip_toast.main(1)  # 上课
-        if current_dt >= afternoon_st + dt.timedelta(seconds=time_offset):
-            for item_name, item_time in timeline_data.items():
-                if item_name.startswith('aa') or item_name.startswith('fa'):
-
-                    add_time = int(item_time)
-                    c_time += dt.timedelta(minutes=add_time)
-                    # 判断时间是否上下课，发送通知
-                    if current_dt == c_time and toast:
-                        if item_name.startswith('fa'):
-                            tip_toast.main(1)  # 上课
-                        else:
-                            tip_toast.main(0)  # 下课
-
-                    if c_time >= current_dt:
-                        # 根据所在时间段使用不同标语
-                        if item_name.startswith('aa'):
-                            return_text.append('当前活动结束还有')
-                        else:
-                            return_text.append('课间时长还有')
-                        time_diff = c_time - current_dt
-                        minute, sec = divmod(time_diff.seconds, 60)
-                        return_text.append(f'{minute:02d}:{sec:02d}')
-                        # 进度条
-                        seconds = time_diff.seconds
-                        return_text.append(int(100 - seconds / (int(item_time) * 60) * 100))
-                        break
-            if not return_text:
-                return_text = ['今日课程已结束', f'00:00', 100]
-        else:
-            time_diff = c_time + dt.timedelta(seconds=time_offset) - current_dt
-            minute, sec = divmod(time_diff.seconds, 60)
-            return_text = ['距离上课还有', f'{minute:02d}:{sec:02d}', 100]
-    # 上午
-    elif morning_st is not None:
-        c_time = morning_st + dt.timedelta(seconds=time_offset)  # 复制 morning_st 时间
-        if current_dt == c_time + dt.timedelta(seconds=time_offset) and toast:
-            tip_toast.main(1)  # 上课
-        if current_dt >= morning_st + dt.timedelta(seconds=time_offset):
-            for item_name, item_time in timeline_data.items():
-                if item_name.startswith('am') or item_name.startswith('fm'):
-
-                    add_time = int(item_time)
-                    c_time += dt.timedelta(minutes=add_time)
-
-                    # 判断时间是否上下课，发送通知
-                    if current_dt == c_time and toast:
-                        if item_name.startswith('fm'):
-                            tip_toast.main(1)  # 上课
-                        else:
-                            tip_toast.main(0)  # 下课`
-                    if c_time >= current_dt:
-                        # 根据所在时间段使用不同标语
-                        if item_name.startswith('am'):
-                            return_text.append('当前活动结束还有')
-                        else:
-                            return_text.append('课间时长还有')
-                        # 返回倒计时、进度条
-                        time_diff = c_time - current_dt
-                        minute, sec = divmod(time_diff.seconds, 60)
-                        return_text.append(f'{minute:02d}:{sec:02d}')
-                        # 进度条
-                        seconds = time_diff.seconds
-                        return_text.append(int(100 - seconds / (int(item_time) * 60) * 100))
-                        break
-            if not return_text:
-                return_text = ['上午课程已结束', f'00:00', 100]
-        else:
-            time_diff = c_time + dt.timedelta(seconds=time_offset) - current_dt
-            minute, sec = divmod(time_diff.seconds, 60)
-            return_text = ['距离上课还有', f'{minute:02d}:{sec:02d}', 100]
-    return return_text
-
-
-# 获取将发生的活动
-def get_next_lessons():
-    global current_state
-    global next_lessons
-    next_lessons = []
-    current_dt = dt.datetime.combine(today, dt.datetime.strptime(current_time, '%H:%M:%S').time())  # 当前时间
-
-    if afternoon_st is not None and current_dt > afternoon_st - dt.timedelta(minutes=30):  # 提前30min获取下午课程
-        c_time = afternoon_st  # 开始时间段
-        for item_name, item_time in timeline_data.items():
-            if item_name.startswith('aa') or item_name.startswith('fa'):
-                if c_time > current_dt:
-                    if item_name.startswith('aa'):
-                        next_lessons.append(current_lessons[item_name])
-                c_time += dt.timedelta(minutes=int(item_time))
-    elif morning_st is not None:
-        c_time = morning_st  # 开始时间段
-        for item_name, item_time in timeline_data.items():
-            if item_name.startswith('am') or item_name.startswith('fm'):
-                if current_dt < c_time:
-                    if item_name.startswith('am'):
-                        next_lessons.append(current_lessons[item_name])
-                c_time += dt.timedelta(minutes=int(item_time))
-
-
-def get_next_lessons_text():
-    if not next_lessons:
-        cache_text = '当前暂无课程'
-    else:
-        cache_text = ''
-        if len(next_lessons) >= 5:
-            range_time = 5
-        else:
-            range_time = len(next_lessons)
-        for i in range(range_time):
-            if range_time > 2:
-                if next_lessons[i] != '暂无课程':
-                    cache_text += f'{presets.get_subject_abbreviation(next_lessons[i])}  '  # 获取课程简称
-                else:
-                    cache_text += f'无  '
-            else:
-                if next_lessons[i] != '暂无课程':
-                    cache_text += f'{next_lessons[i]}  '
-                else:
-                    cache_text += f'暂无  '
-    return cache_text
-
-
-# 获取当前活动
-def get_current_state():
-    global current_state
-    current_dt = dt.datetime.combine(today, dt.datetime.strptime(current_time, '%H:%M:%S').time())  # 当前时间
-    is_changed = False
-    # 下午
-    if afternoon_st is not None and current_dt > afternoon_st - dt.timedelta(minutes=30):
-        c_time = afternoon_st + dt.timedelta(seconds=time_offset)  # 开始时间段
-        for item_name, item_time in timeline_data.items():
-            if item_name.startswith('aa') or item_name.startswith('fa'):
-                c_time += dt.timedelta(minutes=int(item_time))
-                if c_time >= current_dt:
-                    if item_name.startswith('aa'):
-                        current_state = current_lessons[item_name]
-                        is_changed = True
-                    else:
-                        current_state = '课间'
-                        is_changed = True
-                    break
-    # 上午
-    elif morning_st is not None and current_dt > morning_st:
-        c_time = morning_st + dt.timedelta(seconds=time_offset)  # 复制 afternoon_st 时间
-        for item_name, item_time in timeline_data.items():
-            if item_name.startswith('am') or item_name.startswith('fm'):
-                add_time = int(item_time)
-                c_time += dt.timedelta(minutes=add_time)
-                if c_time >= current_dt:
-                    if item_name.startswith('am'):
-                        current_state = current_lessons[item_name]
-                        is_changed = True
-                    else:
-                        current_state = '课间'
-                        is_changed = True
-                    break
-    if not is_changed:
-        current_state = '暂无课程'
-
-
-get_start_time()
-get_current_lessons()
-get_current_state()
-get_next_lessons()
-
-T = TypeVar("T")
+class Visibility(enum.IntEnum):  # 组件窗口的显示状态，只有目标状态改变时才播放动画
+    SHOWN = 0
+    HIDING = 1
+    HIDDEN = 2
+    SHOWING = 3
 
 
 class SystemTrayCard(QWidget):
@@ -389,26 +117,28 @@ class SystemTrayCard(QWidget):
             # move everything x by 15px
             # wg.setGeometry(wg.x() - 15, wg.y(), wg.width(), wg.height())
 
-        self.update_data()
-
-        self.tmr = QTimer(self)
-        self.tmr.timeout.connect(self.update_data)
-        self.tmr.start(1000)
-
-    def destroy(self, destroyWindow: bool = ..., destroySubWindows: bool = ...) -> None:
-        self.tmr.stop()
-        return super().destroy(destroyWindow, destroySubWindows)
-
-    def update_data(self):
-        current_time = dt.datetime.now().strftime('%H:%M:%S')
-
-        get_start_time()
-        get_current_lessons()
-        get_current_state()
-        get_next_lessons()
-
+        self.subscribed = False
+
+    # 卡片只在托盘菜单打开时可见，只在此期间订阅时钟（由托盘菜单的 aboutToShow / aboutToHide 调用）
+    def start_updates(self):
+        if self.subscribed:
+            return
+        self.subscribed = True
+        clock.acquire_seconds()  # 没有其他秒级订阅者时会立即 tick 一次
+        clock.snapshotChanged.connect(self.update_data)
+        if clock.snapshot is not None:
+            self.update_data(clock.snapshot)  # 打开菜单时立即显示最新数据
+
+    def stop_updates(self):
+        if not self.subscribed:
+            return
+        self.subscribed = False
+        clock.snapshotChanged.disconnect(self.update_data)
+        clock.release_seconds()
+
+    def update_data(self, snapshot: ScheduleSnapshot):
         # 倒计时
-        countdown_data = calculate_countdown_from_config()
+        countdown_data = snapshot.custom_countdown
         if countdown_data is not None:
             self.countdown_label.setText(f"距离 {countdown_data.label} 还有")
             self.countdown_data.setText(f"{countdown_data.days} 天")
@@ -416,38 +146,28 @@ class SystemTrayCard(QWidget):
             self.countdown_label.setText('未设置倒数日')
             self.countdown_data.setText('- 天')
 
-        cd_data = get_countdown(toast=False)
-
-        self.current_activity_progress.setValue(cd_data[2])
+        self.current_activity_progress.setValue(snapshot.progress)
 
         # 当前活动
-        self.current_activity_text.setText(current_state if current_state != '暂无课程' else '无课')
+        self.current_activity_text.setText(snapshot.state if snapshot.state != '暂无课程' else '无课')
 
         # 软件名称
         self.software_name.setText(APP_NAME)
 
         # 当前时间
-        self.current_time.setText(current_time)
-
-        # 刷新
-        self.repaint()
-
+        self.current_time.setText(snapshot.time.strftime('%H:%M:%S' if snapshot.show_seconds else '%H:%M'))
 
-class DesktopWidget(QWidget):  # 主要小组件
+        # 刷新（合并到下一次绘制，不强制同步重绘）
+        self.update()
 
-    def __init__(self, path: str, pos: 'tuple[int, int]', enable_tray=False):
-        super().__init__()
-        init_config()
 
-        # create_from_ui(path, theme, base_instance=self)
-        self.ui = load_ui(path)()  # this gets the Ui_Xxxx class
-        self.ui.setupUi(self)
+class SlidingWindow(QWidget):  # 置于屏幕顶部、可滑出 / 滑入的无边框透明窗口
 
-        setTheme(Theme.LIGHT)
-        setThemeColor('#36ABCF')
-        self.menu = None
-        self.exmenu = None
+    def __init__(self, parent: 'QWidget | None' = None):
+        super().__init__(parent)
+        self.visibility = Visibility.HIDDEN
 
+    def init_window(self):
         # 设置窗口无边框和透明背景
         pin_on_top_cfg = conf.CFG.general.pin_on_top
         if pin_on_top_cfg is None or int(pin_on_top_cfg):  # 置顶
@@ -457,6 +177,108 @@ class DesktopWidget(QWidget):  # 主要小组件
 
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
 
+    def init_animation(self, pos: 'tuple[int, int]'):
+        # 设置窗口位置；所有显示 / 隐藏动画共用一个动画对象
+        self.animation = QPropertyAnimation(self, QByteArray(b"geometry"))
+        self.animation.setDuration(555)  # 持续时间
+        self.animation.finished.connect(self.on_animation_finished)
+        self.anim_window_creation(pos)
+
+    def anim_window_creation(self, target_pos):  # 窗口动画！
+        self.set_visibility(Visibility.SHOWING)
+        self.start_animation(QRect(target_pos[0], -self.height(), self.width(), self.height()),
+                             QRect(target_pos[0], target_pos[1], self.width(), self.height()), QEasingCurve.InOutCirc)
+
+    def anim_window_hide(self):  # 隐藏窗口
+        if self.visibility in (Visibility.HIDDEN, Visibility.HIDING):
+            return
+        self.set_visibility(Visibility.HIDING)
+        self.start_animation(self.geometry(), QRect(self.x(), 40 - self.height(), self.width(), self.height()), QEasingCurve.OutExpo)
+
+    def anim_window_show(self):  # 显示窗口
+        margin_cfg = conf.CFG.general.margin
+        target_y = int(margin_cfg or "10")
+        # 已显示时只有边距改变才需要移动
+        if self.visibility == Visibility.SHOWING or (self.visibility == Visibility.SHOWN and self.y() == target_y):
+            return
+        self.set_visibility(Visibility.SHOWING)
+        self.start_animation(self.geometry(), QRect(self.x(), target_y, self.width(), self.height()), QEasingCurve.OutExpo)
+
+    def start_animation(self, start: QRect, end: QRect, easing: QEasingCurve.Type):
+        # 复用同一个动画对象；反向切换时从当前位置开始
+        self.animation.stop()
+        self.animation.setStartValue(start)
+        self.animation.setEndValue(end)
+        self.animation.setEasingCurve(easing)  # 设置动画效果
+        self.animation.start()
+
+    def on_animation_finished(self):
+        if self.visibility == Visibility.HIDING:
+            self.set_visibility(Visibility.HIDDEN)
+        elif self.visibility == Visibility.SHOWING:
+            self.set_visibility(Visibility.SHOWN)
+
+    def set_visibility(self, visibility: Visibility):
+        self.visibility = visibility
+        self.update_rendering()
+
+    def content_panels(self) -> 'list[DesktopWidget]':
+        return []
+
+    def update_rendering(self):
+        # 窗口可见性（滑出、最小化、显示 / 隐藏）或会话状态变化后，由各组件决定是否继续刷新界面
+        for panel in self.content_panels():
+            panel.update_rendering_state()
+
+    def showEvent(self, event: QShowEvent) -> None:
+        super().showEvent(event)
+        self.update_rendering()
+
+    def hideEvent(self, event: QHideEvent) -> None:
+        super().hideEvent(event)
+        self.update_rendering()
+
+    def changeEvent(self, event: QEvent) -> None:
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:  # 最小化 / 还原
+            self.update_rendering()
+
+    def should_hide(self, current_state: str) -> bool:
+        if conf.CFG.general.auto_hide:
+            return not (current_state == '课间' or current_state == '暂无课程')
+        return conf.CFG.temp.hide
+
+    def update_hide_show_state(self):
+        current_state = clock.snapshot.state if clock.snapshot is not None else ''
+        if self.should_hide(current_state):
+            self.anim_window_hide()
+        else:
+            self.anim_window_show()
+
+    # 点击自动隐藏
+    def mousePressEvent(self, event):
+        conf.CFG.temp.hide = not conf.CFG.temp.hide
+        conf.save()
+        broadcast_hide_show_state_change()
+
+
+class DesktopWidget(SlidingWindow):  # 主要小组件
+
+    def __init__(self, path: str, pos: 'tuple[int, int]', enable_tray=False, parent: 'OverlayWindow | None' = None):
+        super().__init__(parent)
+        self.path = path
+        self.embedded = parent is not None  # 单窗口模式下作为 OverlayWindow 中的面板，由其负责显示 / 隐藏
+
+        # create_from_ui(path, theme, base_instance=self)
+        self.ui = load_ui(path)()  # this gets the Ui_Xxxx class
+        self.ui.setupUi(self)
+
+        setTheme(Theme.LIGHT)
+        setThemeColor('#36ABCF')
+
+        if not self.embedded:
+            self.init_window()
+
         # 添加阴影效果
         # shadow_effect = QGraphicsDropShadowEffect(self)
         # shadow_effect.setBlurRadius(22)
@@ -487,6 +309,8 @@ class DesktopWidget(QWidget):  # 主要小组件
 
                 self.tray_card = SystemTrayCard(self)
                 self.tray_menu.addWidget(self.tray_card, selectable=False)
+                self.tray_menu.aboutToShow.connect(self.tray_card.start_updates)
+                self.tray_menu.aboutToHide.connect(self.tray_card.stop_updates)
 
                 self.tray_menu.addAction(Action('提高不透明度', self, triggered=increase_opacity))
                 self.tray_menu.addAction(Action('降低不透明度', self, triggered=decrease_opacity))
@@ -499,175 +323,115 @@ class DesktopWidget(QWidget):  # 主要小组件
                 # 显示托盘图标
                 self.tray_icon.show()
 
-        if path == 'widget-time.ui':  # 日期显示
-            self.date_text = self.findChild(QLabel, 'date_text')
-            self.date_text.setText(f'{today.year} 年 {today.month} 月')
-            self.day_text = self.findChild(QLabel, 'day_text')
-            self.day_text.setText(f'{today.day}日  {presets.week[today.weekday()]}')
-
-        elif path == 'widget-countdown.ui':  # 活动倒计时
-            self.countdown_progress_bar = self.findChild(QProgressBar, 'progressBar')
-            self.activity_countdown = self.findChild(QLabel, 'activity_countdown')
-            self.ac_title = self.findChild(QLabel, 'activity_countdown_title')
-
-        elif path == 'widget-current-activity.ui':  # 当前活动
-            self.current_state_text = self.findChild(QPushButton, 'subject')
-            self.blur_effect_label = self.findChild(QLabel, 'blurEffect')
-            # 模糊效果
-            self.blur_effect = QGraphicsBlurEffect()
-            button = self.findChild(QPushButton, 'subject')
-            button.clicked.connect(self.open_exact_menu)
-
-        elif path == 'widget-next-activity.ui':  # 接下来的活动
-            self.nl_text = self.findChild(QLabel, 'next_lesson_text')
-
-        elif path == 'widget-countdown-custom.ui':  # 自定义倒计时
-            self.custom_title = self.findChild(QLabel, 'countdown_custom_title')
-            self.custom_countdown = self.findChild(QLabel, 'custom_countdown')
-
-        # 设置窗口位置
-        self.anim_window_creation(pos)
-
-        self.update_data(1)
+        # 组件类型（见 widgets.py）：依赖的数据、控件与显示内容
+        self.kind = widgets.get_widget_type(path)
+        self.kind.setup(self)
 
-        self.timer = QTimer(self)
-        self.timer.setInterval(1000)
-        self.timer.timeout.connect(lambda: self.update_data(path=path))
-        self.timer.start()
+        # 所有组件共享 ScheduleClock 的快照，只在自己依赖的数据变化时更新
+        self.rendering = False  # 组件实际可见时才把快照应用到控件上，隐藏期间只保存最新快照
+        self.snapshot: 'ScheduleSnapshot | None' = None
+        self._rendered: 'dict[str, Any]' = {}  # 上次应用到控件上的 view_model 字段
 
-    def showEvent(self, event: QShowEvent) -> None:
-        return super().showEvent(event)
+        if self.embedded:
+            self.move(*pos)
+        else:
+            self.init_animation(pos)
+
+        self.update_data(clock.snapshot)
+        clock.changed.connect(self.on_clock_changed)
+
+    def content_panels(self) -> 'list[DesktopWidget]':
+        return [self]
+
+    def is_effectively_visible(self) -> bool:
+        """滑出屏幕、最小化、窗口隐藏，或锁屏 / 屏幕关闭时返回 False"""
+        window = self.window()
+        if not window.isVisible() or window.isMinimized():
+            return False
+        if isinstance(window, SlidingWindow) and window.visibility in (Visibility.HIDING, Visibility.HIDDEN):
+            return False
+        return session_monitor.active
+
+    def update_rendering_state(self):
+        rendering = self.is_effectively_visible()
+        if rendering == self.rendering:
+            return
+        self.rendering = rendering
+        # 只有可见时才需要逐秒 / 逐分钟的 tick
+        if self.kind.depends & Change.SECOND:
+            if rendering:
+                clock.acquire_seconds()
+            else:
+                clock.release_seconds()
+        elif self.kind.depends & Change.MINUTE:
+            if rendering:
+                clock.acquire_minutes()
+            else:
+                clock.release_minutes()
+        if rendering and self.snapshot is not None:
+            self.render_view(self.view_model(self.snapshot))  # 重新可见：一次性应用隐藏期间的所有变化
 
     def findChild(self, arg__1: Type[T], arg__2: str = ...) -> T:
         return super().findChild(arg__1, arg__2)  # type: ignore
 
     def open_settings(self):
-        if self.menu is None or not self.menu.isVisible():  # 防多开
-            self.menu = menu.desktop_widget()
-            self.menu.show()
-        else:
-            self.menu.raise_()
-            self.menu.activateWindow()
+        ipc.open_settings_window('settings')
 
     def open_exact_menu(self):
         if not conf.CFG.temp.hide:
-            if self.exmenu is None or not self.exmenu.isVisible():  # 防多开
-                self.exmenu = exact_menu.ExactMenu()
-                self.exmenu.show()
-            else:
-                self.exmenu.raise_()
-                self.exmenu.activateWindow()
+            ipc.open_settings_window('exact_menu')
         else:
             conf.CFG.temp.hide = False
             conf.save()
             broadcast_hide_show_state_change()
 
-    def anim_window_creation(self, target_pos):  # 窗口动画！
-        # 创建位置动画
-        self.animation = QPropertyAnimation(self, QByteArray(b"geometry"))
-        self.animation.setDuration(555)  # 持续时间
-        self.animation.setStartValue(QRect(target_pos[0], -self.height(), self.width(), self.height()))
-        self.animation.setEndValue(QRect(target_pos[0], target_pos[1], self.width(), self.height()))
-        self.animation.setEasingCurve(QEasingCurve.InOutCirc)  # 设置动画效果
-        self.animation.start()
-
-    def anim_window_hide(self):  # 隐藏窗口
-        self.animation = QPropertyAnimation(self, QByteArray(b"geometry"))
-        self.animation.setDuration(555)  # 持续时间
-        self.animation.setStartValue(QRect(self.x(), self.y(), self.width(), self.height()))
-        self.animation.setEndValue(QRect(self.x(), 40 - self.height(), self.width(), self.height()))
-        self.animation.setEasingCurve(QEasingCurve.OutExpo)  # 设置动画效果
-        self.animation.start()
-
-    def anim_window_show(self):  # 显示窗口
-        self.animation = QPropertyAnimation(self, QByteArray(b"geometry"))
-        self.animation.setDuration(555)  # 持续时间
-        self.animation.setStartValue(QRect(self.x(), self.y(), self.width(), self.height()))
-        margin_cfg = conf.CFG.general.margin
-        self.animation.setEndValue(QRect(self.x(), int(margin_cfg or "10"), self.width(), self.height()))
-        self.animation.setEasingCurve(QEasingCurve.OutExpo)  # 设置动画效果
-        self.animation.start()
-
-    def update_data(self, first_setup=0, path=''):
-        global current_time, current_week, filename, start_y, time_offset
+    def on_clock_changed(self, snapshot: ScheduleSnapshot, changes: Change):
+        if changes & (Change.PERIOD | Change.CONFIG) and not self.embedded:  # 自动隐藏取决于当前活动
+            self.update_hide_show_state()
+        if changes & self.kind.depends:
+            self.update_data(snapshot)
+        else:
+            self.snapshot = snapshot
 
-        current_time = dt.datetime.now().strftime('%H:%M:%S')
+    def update_data(self, snapshot: ScheduleSnapshot):
+        self.snapshot = snapshot
+        if self.rendering:
+            self.render_view(self.view_model(snapshot))
 
-        filename = conf.CFG.general.schedule
-        time_offset = get_time_offset()
+    def view_model(self, snapshot: ScheduleSnapshot) -> 'dict[str, Any]':
+        """当前快照下组件应显示的内容；与上次渲染的结果比较后只应用变化的部分"""
+        return self.kind.view(snapshot)
 
-        get_start_time()
-        get_current_lessons()
-        get_current_state()
-        get_next_lessons()
+    def render_view(self, view: 'dict[str, Any]'):
+        for key, value in view.items():
+            if key in self._rendered and self._rendered[key] == value:
+                continue
+            self._rendered[key] = value
+            self.apply_field(key, value)
 
-        if not first_setup:  # 如果不是初次启动
-            self.update_hide_show_state()
+    def apply_field(self, key: str, value: Any):
+        self.kind.apply(self, key, value)
 
-        if is_temp_week():  # 调休日
-            current_week = conf.CFG.temp.set_week
-        else:
-            current_week = dt.datetime.now().weekday()
 
-        filename = conf.CFG.general.schedule
+class OverlayWindow(SlidingWindow):
+    """
+    单窗口模式（``general.single_window``）：所有组件作为子面板排列在同一个透明窗口中，
+    只有一个顶层窗口的缓冲区与合成层，一次绘制、一个滑动动画。
+    """
 
-        transparent_cfg = conf.CFG.general.transparent
-        bkg = self.findChild(QLabel, 'label')
-        bkg.setStyleSheet(f'background-color: rgba(242, 243, 245, {int(transparent_cfg or "240")}); border-radius: 8px')  # 背景透明度
-
-        if path != 'widget-current-activity.ui':  # 不是当前活动组件
-            cd_list = get_countdown()
-        else:
-            cd_list = get_countdown(toast=True)
-
-        # infer widget type from ui attributes
-        if hasattr(self, 'day_text'):
-            self.date_text.setText(f'{today.year} 年 {today.month} 月')
-            self.day_text.setText(f'{today.day} 日 {presets.week[today.weekday()]}')
-
-        if hasattr(self, 'current_state_text'):
-            # 实时活动
-            self.current_state_text.setText(f'  {current_state}')
-            self.current_state_text.setIcon(QIcon(presets.get_subject_icon(current_state)))
-            self.blur_effect.setBlurRadius(35)  # 模糊半径
-            self.blur_effect_label.setStyleSheet(f'background-color: rgba{presets.subject_color(current_state)}, {bkg_opacity});')
-            self.blur_effect_label.setGraphicsEffect(self.blur_effect)
-
-        if hasattr(self, 'next_lesson_text'):
-            self.nl_text.setText(get_next_lessons_text())
-
-        if hasattr(self, 'activity_countdown'):
-            if cd_list:
-                self.activity_countdown.setText(cd_list[1])
-                self.ac_title.setText(cd_list[0])
-                self.countdown_progress_bar.setValue(cd_list[2])
-
-        if hasattr(self, 'countdown_custom_title'):
-            cd_data = calculate_countdown_from_config()
-            if cd_data:
-                self.custom_title.setText(f'距离 {cd_data.label} 还有')
-                self.custom_countdown.setText(f"{cd_data.days} 天")
-            else:
-                self.custom_title.setText('未设置倒数日')
-                self.custom_countdown.setText('-')
-
-    def update_hide_show_state(self):
-        if conf.CFG.general.auto_hide:
-            if current_state == '课间' or current_state == '暂无课程':
-                self.anim_window_show()
-            else:
-                self.anim_window_hide()
-        else:
-            if conf.CFG.temp.hide:
-                self.anim_window_hide()
-            else:
-                self.anim_window_show()
+    def __init__(self, widgets: 'list[str]', pos: 'tuple[int, int]', offsets: 'list[int]'):
+        super().__init__()
+        self.init_window()
+        self.setWindowTitle(APP_NAME)
+        self.panels = [DesktopWidget(path, (x, 0), enable_tray=i == 0, parent=self)
+                       for i, (path, x) in enumerate(zip(widgets, offsets))]
+        self.resize(max((p.x() + p.width() for p in self.panels), default=0),
+                    max((p.height() for p in self.panels), default=0))
+        self.init_animation(pos)
+        clock.stateChanged.connect(self.update_hide_show_state)
 
-    # 点击自动隐藏
-    def mousePressEvent(self, event):
-        conf.CFG.temp.hide = not conf.CFG.temp.hide
-        conf.save()
-        broadcast_hide_show_state_change()
+    def content_panels(self) -> 'list[DesktopWidget]':
+        return self.panels
 
 
 def broadcast_hide_show_state_change():
@@ -675,16 +439,181 @@ def broadcast_hide_show_state_change():
         win.update_hide_show_state()
 
 
-def init_config():  # 重设配置文件
+def on_session_active_changed(_active: bool):  # 锁屏 / 解锁、屏幕关闭 / 打开
+    for win in windows:
+        win.update_rendering()
+
+
+def init_config():  # 重设只对当天有效的配置（启动时、跨天时）
     conf.CFG.temp.set_week = ''
     conf.CFG.temp.hide = False
-    conf.save()
 
-    if conf.CFG.temp.temp_schedule:  # 修复换课重置
-        # copy('config/schedule/backup.json', f'config/schedule/{filename}')
-        copy(CONFIG_DIR / 'schedule' / 'backup.json', CONFIG_DIR / 'schedule' / f'{filename}')
+    if conf.CFG.temp.temp_schedule:  # 旧版本换课会改写课表文件并留下 backup.json，恢复一次
+        backup = CONFIG_DIR / 'schedule' / 'backup.json'
+        if backup.exists():
+            copy(backup, CONFIG_DIR / 'schedule' / conf.CFG.general.schedule)
+            backup.unlink()
         conf.CFG.temp.temp_schedule = ''
-        conf.save()
+
+    overlay = conf.CFG.temp.overlay
+    if overlay is not None and get_schedule_overlay(overlay.profile) is None:  # 临时换课已过期
+        conf.CFG.temp.overlay = None
+    conf.save()
+
+
+def create_widgets():
+    widgets = presets.get_widget_config()
+
+    # 所有组件窗口的宽度
+    offsets, total_width = presets.layout_offsets(widgets)
+
+    start_x = int((screen_width - total_width) / 2)
+    margin_cfg = conf.CFG.general.margin
+    start_y = int(margin_cfg or "10")
+
+    if conf.CFG.general.single_window:
+        windows.append(OverlayWindow(widgets, (start_x, start_y), offsets))
+    else:
+        for w in range(len(widgets)):
+            wg = DesktopWidget(widgets[w], (start_x + offsets[w], start_y), enable_tray=w == 0)
+            windows.append(wg)  # 将窗口对象添加到列表
+
+    for application in windows:  # 显示所有窗口
+        logger.info(f'显示窗口：{application.windowTitle()}')
+        application.show()
+        app.processEvents()
+
+
+def rebuild_widgets():  # 组件布局（widget.json）变化后重新创建所有组件窗口
+    logger.info('组件布局已变化，重新创建组件窗口')
+    for application in windows:
+        application.close()
+        application.deleteLater()
+    windows.clear()
+    create_widgets()
+
+
+def on_config_changed(section: str):
+    if section == 'general' and windows and isinstance(windows[0], OverlayWindow) != conf.CFG.general.single_window:
+        rebuild_widgets()
+    if section == 'temp':
+        timetable.invalidate_overlay()
+    if section in ('general', 'date', 'temp'):
+        scheduler.refresh()
+        clock.refresh()
+    if section == 'audio':
+        audio.load_bells()
+
+
+def on_day_changed(_date):  # 跨天：与每天重启程序一样重置只对当天有效的设置（调休、换课、隐藏）
+    timetable.invalidate_overlay()
+    init_config()
+    broadcast_hide_show_state_change()
+    lifecycle.log_object_counts()  # 长时间运行时确认窗口与对象数量保持稳定
+
+
+def on_schedule_changed(name: str):
+    if name == conf.CFG.general.schedule:
+        scheduler.refresh()
+        clock.refresh()
+
+
+def render_snapshots(instants: 'list[dt.datetime]', out: str) -> int:
+    """
+    无界面渲染：按 widget.json 创建组件面板（不显示窗口、不启动调度），
+    为每个时刻计算快照并把整个组件栏绘制为 PNG，同时输出每个组件的更新 / 绘制耗时。
+    ``out`` 可以包含 strftime 格式（如 ``bar-%H%M.png``），用于批量输出。
+    """
+    widgets = presets.get_widget_config()
+    offsets, total_width = presets.layout_offsets(widgets)
+    clock.snapshot = make_snapshot(instants[0])  # 组件构造时渲染的初始快照
+    container = QWidget()
+    container.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+
+    panels = []
+    for path, x in zip(widgets, offsets):
+        start = time.perf_counter()
+        panel = DesktopWidget(path, (x, 0), parent=container)
+        for bar in panel.findChildren(ProgressBar):  # 进度条默认以动画过渡到新值，截图时直接使用最终值
+            bar.setUseAni(False)
+            bar.setVal(bar.value())
+        panels.append(panel)
+        print(f'{path:<28} setup  {(time.perf_counter() - start) * 1000:8.2f} ms')
+    height = max((p.height() for p in panels), default=0)
+    container.resize(total_width, height)
+    dpr = app.primaryScreen().devicePixelRatio()
+
+    for at in instants:
+        clock.snapshot = snapshot = make_snapshot(at)
+        pixmap = QPixmap(QSize(total_width, height) * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        for panel in panels:
+            start = time.perf_counter()
+            panel.snapshot = snapshot
+            view = panel.view_model(snapshot)
+            view.pop('animate', None)  # 截图时进度条保持无动画
+            panel.render_view(view)  # 面板不可见，直接应用快照
+            updated = time.perf_counter()
+            # 与透明窗口一致，不绘制窗口背景
+            panel.render(painter, QPoint(panel.x(), 0), QRegion(), QWidget.DrawChildren)
+            painted = time.perf_counter()
+            print(f'{panel.path:<28} update {(updated - start) * 1000:8.2f} ms  paint {(painted - updated) * 1000:8.2f} ms')
+        painter.end()
+
+        filename = at.strftime(out)
+        if not pixmap.save(filename, 'PNG'):
+            logger.error(f'无法写入 {filename}')
+            return 1
+        print(f'{at.isoformat()} -> {filename}')
+    return 0
+
+
+def parse_args(argv: 'list[str]'):
+    parser = argparse.ArgumentParser(prog=APP_NAME)
+    parser.add_argument('--render-snapshot', action='store_true', help='不显示窗口，把组件栏渲染为 PNG 后退出')
+    parser.add_argument('--at', action='append', type=dt.datetime.fromisoformat, metavar='ISO_TIME',
+                        help='渲染的时刻，如 2026-10-19T10:15，可重复；默认为当前时间')
+    parser.add_argument('--out', default='bar.png', help='输出文件，可包含 strftime 格式（如 bar-%%H%%M.png）')
+    parser.add_argument('--settings', nargs='?', const='settings', choices=['settings', 'exact_menu'],
+                        help='作为设置进程运行，只打开设置（或更多功能）窗口，所有窗口关闭后退出')
+    # 其余参数（如 -platform）交给 Qt
+    return parser.parse_known_args(argv[1:])[0]
+
+
+def run_settings(window: str) -> int:
+    """
+    设置进程：组件进程不导入设置界面，打开设置时启动本进程（``--settings``），
+    之后的打开请求通过本地套接字转发给它；所有窗口关闭后退出。
+    """
+    if ipc.send(ipc.SETTINGS_SERVER, f'open {window}'):
+        return 0  # 设置进程已在运行
+    import exact_menu  # 注册 lifecycle 窗口：exact_menu、settings
+
+    server = ipc.MessageServer(ipc.SETTINGS_SERVER)
+    if not server.listen() and ipc.send(ipc.SETTINGS_SERVER, f'open {window}'):
+        return 0  # 另一个设置进程刚刚开始监听
+
+    def on_message(message: str):
+        command, _, name = message.partition(' ')
+        if command == 'open' and name in lifecycle.WINDOWS:
+            lifecycle.open_window(name)
+
+    def quit_if_idle():
+        if not lifecycle.any_visible():
+            app.quit()
+
+    server.messageReceived.connect(on_message)
+    for managed in lifecycle.WINDOWS.values():
+        managed.closed.connect(lambda: QTimer.singleShot(0, quit_if_idle))  # 窗口在 closeEvent 中才隐藏
+    config_watcher = ConfigWatcher()  # 组件进程也会写 config.json，保存前需要读到最新的配置
+    config_watcher.start()
+
+    lifecycle.open_window(window)
+    code = app.exec_()
+    server.close()
+    return code
 
 
 def _interrupt_handler(*_, **__):
@@ -707,6 +636,10 @@ if __name__ == '__main__':
     # QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
     # QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
 
+    args = parse_args(sys.argv)
+    if args.render_snapshot:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
     translator = FluentTranslator()
 
     app = QApplication(sys.argv)
@@ -733,6 +666,9 @@ if __name__ == '__main__':
     if sys.platform == 'win32' and sys.getwindowsversion().build >= 22000:  # 修改在win11高版本阴影异常
         app.setStyle("Fusion")
 
+    if args.settings:
+        sys.exit(run_settings(args.settings))
+
     theme = 'default'
 
     # 获取屏幕横向分辨率
@@ -743,21 +679,33 @@ if __name__ == '__main__':
     screen_geometry = primary_screen.availableGeometry()
     screen_width = screen_geometry.width()
 
-    widgets = presets.get_widget_config()
-
-    # 所有组件窗口的宽度
-    spacing = -5
-    total_width = sum((presets.widget_width[key] for key in widgets), spacing * (len(widgets) - 1))
-
-    start_x = int((screen_width - total_width) / 2)
-    margin_cfg = conf.CFG.general.margin
-    start_y = int(margin_cfg or "10")
-
-    def cal_start_width(num):
-        width = 0
-        for i in range(num):
-            width += presets.widget_width[widgets[i]]
-        return int(start_x + spacing * num + width)
+    session_monitor = session.create_monitor()
+
+    if args.render_snapshot:
+        scheduler = TransitionScheduler()  # 不启动：只用于构造时钟
+        clock = ScheduleClock(scheduler)
+        sys.exit(render_snapshots(args.at or [dt.datetime.now()], args.out))
+
+    init_config()
+
+    # 上下课切换调度（铃声、通知），所有组件共享同一个时钟快照
+    scheduler = TransitionScheduler()
+    clock = ScheduleClock(scheduler)
+    audio.get_sink()  # 启动时创建音频输出并解码铃声，响铃时直接播放
+    scheduler.lessonStarted.connect(lambda lesson: tip_toast.main(1, lesson, scheduler.due))  # 上课
+    scheduler.breakStarted.connect(lambda lesson: tip_toast.main(0, lesson, scheduler.due))  # 下课
+    scheduler.dayEnded.connect(lambda: tip_toast.main(2, due=scheduler.due))  # 放学
+    scheduler.transitionSoon.connect(lambda event: tip_toast.prewarm(event.kind, event.lesson))  # 提前准备通知窗口
+    scheduler.dayChanged.connect(on_day_changed)
+    scheduler.start()
+    if clock.snapshot is None:
+        clock.tick()
+
+    watcher = ConfigWatcher()
+    watcher.configChanged.connect(on_config_changed)
+    watcher.scheduleChanged.connect(on_schedule_changed)
+    watcher.widgetLayoutChanged.connect(rebuild_widgets)
+    session_monitor.activeChanged.connect(on_session_active_changed)
 
     # TODO add an action in menu to add shortcut to startmenu/desktop, instead of creating shortcut automatically without user's consent
     # if conf.CFG.other.initialstartup == '1':  # 首次启动
@@ -775,18 +723,8 @@ if __name__ == '__main__':
     #     except Exception as e:
     #         logger.error(f'添加快捷方式失败：{e}')
 
-    for w in range(len(widgets)):
-        # if w == 0:
-        #     show_window(widgets[w], (cal_start_width(w), start_y), True)
-        # else:
-        #     show_window(widgets[w], (cal_start_width(w), start_y))
-        wg = DesktopWidget(widgets[w], (cal_start_width(w), start_y), enable_tray=w == 0)
-        windows.append(wg)  # 将窗口对象添加到列表
-
-    for application in windows:  # 显示所有窗口
-        logger.info(f'显示窗口：{application.windowTitle()}')
-        application.show()
-        app.processEvents()
+    create_widgets()
+    watcher.start()
 
     signal.signal(signal.SIGINT, _interrupt_handler)
     signal.signal(signal.SIGTERM, _interrupt_handler)
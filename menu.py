@@ -1,8 +1,7 @@
-import datetime as dt
 import os
 import sys
 from copy import deepcopy
-from typing import Type, cast
+from typing import Callable, Optional, Type, cast
 
 import requests
 from loguru import logger
@@ -21,14 +20,13 @@ from qfluentwidgets import (FluentWindow, Flyout, FlyoutAnimationType, InfoBarIc
 from typing_extensions import TypeVar
 
 import conf
+import lifecycle
 import presets
 from assets import get_img_dir
 from globals import APP_NAME
 from utils import (assert_not_none, check_if_widget_included, create_from_ui, load_ui, read_schedule_config, refresh_startup, update_schedule_config,
                    update_widget_config)
 
-today = dt.date.today()
-
 width = 1200
 height = 800
 
@@ -67,6 +65,35 @@ schedule_even_dict = {}  # 对应时间线的课程表（双周）
 T = TypeVar('T')
 
 
+class LazyPage(QWidget):
+    """导航页面的占位：导航项在启动时注册，第一次切换到该页面时才加载 .ui 并初始化"""
+
+    def __init__(self, ui_file: str, name: str, setup: Callable[[], None], parent: 'QWidget | None' = None):
+        super().__init__(parent)
+        self.setObjectName(name)
+        self.ui_file = ui_file
+        self.setup = setup
+        self.page: Optional[QWidget] = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    @property
+    def loaded(self) -> bool:
+        return self.page is not None
+
+    def load(self) -> QWidget:
+        if self.page is None:
+            self.page = create_from_ui(self.ui_file, parent=self)
+            assert_not_none(self.layout()).addWidget(self.page)
+            self.setup()
+        return self.page
+
+    def unload(self):
+        if self.page is not None:
+            page, self.page = self.page, None
+            page.setParent(None)  # 交给 Python 释放，之后 findChild 不会再找到旧页面
+
+
 class desktop_widget(FluentWindow):
 
     def findChild(self, arg__1: Type[T], arg__2: str = ...) -> T:
@@ -77,32 +104,23 @@ class desktop_widget(FluentWindow):
         # 设置窗口无边框和透明背景
         # self.setWindowFlags(Qt.FramelessWindowHint)  # incompatible with PySide2-FluentWidgets
 
-        # 创建子页面
-        self.spInterface = create_from_ui('menu-preview.ui', parent=self)
-        self.spInterface.setObjectName("spInterface")
-
-        self.teInterface = create_from_ui('menu-timeline_edit.ui', parent=self)
-        self.teInterface.setObjectName("teInterface")
+        self.schedule_loaded = False
 
-        self.seInterface = create_from_ui('menu-schedule_edit.ui', parent=self)
-        self.seInterface.setObjectName("seInterface")
-
-        self.adInterface = create_from_ui('menu-advance.ui', parent=self)
-        self.adInterface.setObjectName("adInterface")
-
-        self.ifInterface = create_from_ui('menu-about.ui', parent=self)
-        self.ifInterface.setObjectName("ifInterface")
-
-        self.ctInterface = create_from_ui('menu-custom.ui', parent=self)
-        self.ctInterface.setObjectName("ctInterface")
-
-        self.cfInterface = create_from_ui('menu-configs.ui', parent=self)
-        self.cfInterface.setObjectName("cfInterface")
+        # 创建子页面（占位，切换到页面时才加载）
+        self.spInterface = LazyPage('menu-preview.ui', 'spInterface', self.setup_schedule_preview, self)
+        self.teInterface = LazyPage('menu-timeline_edit.ui', 'teInterface', self.setup_timeline_edit, self)
+        self.seInterface = LazyPage('menu-schedule_edit.ui', 'seInterface', self.setup_schedule_edit, self)
+        self.adInterface = LazyPage('menu-advance.ui', 'adInterface', self.setup_advance_interface, self)
+        self.ifInterface = LazyPage('menu-about.ui', 'ifInterface', self.setup_about_interface, self)
+        self.ctInterface = LazyPage('menu-custom.ui', 'ctInterface', self.setup_customization_interface, self)
+        self.cfInterface = LazyPage('menu-configs.ui', 'cfInterface', self.setup_configs_interface, self)
 
         self.init_nav()
         self.init_window()
 
         def _patched_setCurrentWidget(widget, popOut=True):
+            if isinstance(widget, LazyPage):
+                widget.load()
             if isinstance(widget, QAbstractScrollArea):
                 widget.verticalScrollBar().setValue(0)
 
@@ -115,14 +133,24 @@ class desktop_widget(FluentWindow):
     def switchTo(self, interface: QWidget):
         self.stackedWidget.setCurrentWidget(interface, popOut=False)
 
-    def load_all_item(self):
-        self.setup_timeline_edit()
-        self.setup_schedule_edit()
-        self.setup_schedule_preview()
-        self.setup_advance_interface()
-        self.setup_about_interface()
-        self.setup_customization_interface()
-        self.setup_configs_interface()
+    def load_current_page(self):  # 窗口显示后再读取课表、加载初始页面
+        self.load_schedule()
+        current = self.stackedWidget.currentWidget()
+        if isinstance(current, LazyPage):
+            current.load()
+
+    def refresh(self):  # 重新打开时丢弃已加载的页面，按最新的配置与课表重新加载
+        global filename
+        filename = conf.CFG.general.schedule
+        self.schedule_loaded = False
+        for page in self.findChildren(LazyPage):
+            page.unload()
+        self.load_current_page()
+
+    def load_schedule(self):
+        if not self.schedule_loaded:
+            self.se_load_item()
+            self.schedule_loaded = True
 
     # 初始化界面
     def setup_configs_interface(self):
@@ -237,7 +265,7 @@ class desktop_widget(FluentWindow):
         cast(SignalInstance, offset_spin.valueChanged).connect(_save_offset)
 
     def setup_schedule_edit(self):
-        self.se_load_item()
+        self.load_schedule()
         se_set_button = self.findChild(ToolButton, 'set_button')
         se_set_button.setIcon(fIcon.EDIT)
         cast(SignalInstance, se_set_button.clicked).connect(self.se_edit_item)
@@ -299,6 +327,7 @@ class desktop_widget(FluentWindow):
         self.te_load_item()
 
     def setup_schedule_preview(self):
+        self.load_schedule()
         schedule_view = self.findChild(TableWidget, 'schedule_view')
         assert_not_none(schedule_view.horizontalHeader()).setSectionResizeMode(QHeaderView.ResizeMode.Stretch)  # 使列表自动等宽
 
@@ -506,13 +535,16 @@ class desktop_widget(FluentWindow):
             self.close()
 
     def sp_fill_grid_row(self):  # 填充预览表格
+        if not self.spInterface.loaded:
+            return
         sp_week_type_combo = self.findChild(ComboBox, 'pre_week_type_combo')
         schedule_view = self.findChild(TableWidget, 'schedule_view')
-        schedule_view.setRowCount(sp_get_class_num())
         if sp_week_type_combo.currentIndex() == 1:
             schedule_dict_sp = schedule_even_dict
         else:
             schedule_dict_sp = schedule_dict
+        # 每天的列表都按时间线生成，长度即为课程数
+        schedule_view.setRowCount(max((len(day) for day in schedule_dict_sp.values()), default=0))
         for i in range(len(schedule_dict_sp)):
             for j in range(len(schedule_dict_sp[str(i)])):
                 item_text = schedule_dict_sp[str(i)][j].split('-')[0]
@@ -524,8 +556,9 @@ class desktop_widget(FluentWindow):
                 item.setTextAlignment(Qt.AlignCenter)  # 设置单元格文本居中对齐
 
     # 加载时间线
-    def te_load_item(self, file=filename):
+    def te_load_item(self, file: 'str | None' = None):
         global morning_st, afternoon_st
+        file = file or filename  # 默认为当前正在编辑的课表
         # loaded_data = conf.load_from_json(file)
         schedule_data = read_schedule_config(file)
         assert schedule_data is not None, 'Schedule load failed'
@@ -572,9 +605,10 @@ class desktop_widget(FluentWindow):
                 self.te_detect_item()
 
     # 加载课表
-    def se_load_item(self, file=filename):
+    def se_load_item(self, file: 'str | None' = None):
         global schedule_dict
         global schedule_even_dict
+        file = file or filename  # 默认为当前正在编辑的课表
         # loaded_data = conf.load_from_json(file)
         # loaded_data_timeline = conf.load_from_json(file)
         loaded_data = read_schedule_config(file)
@@ -643,6 +677,8 @@ class desktop_widget(FluentWindow):
 
     # 上传课表到列表组件
     def se_upload_list(self):
+        if not self.seInterface.loaded:
+            return
         logger.info('更新列表：课程表编辑')
         se_schedule_list = self.findChild(ListWidget, 'schedule_list')
         se_schedule_list.clearSelection()
@@ -854,7 +890,7 @@ class desktop_widget(FluentWindow):
 
     def init_window(self):
         self.stackedWidget.setCurrentIndex(0)  # 设置初始页面
-        self.load_all_item()
+        QTimer.singleShot(0, self.load_current_page)
         self.resize(width, height)
         self.setMinimumWidth(800)
         self.setMinimumHeight(500)
@@ -876,6 +912,8 @@ class desktop_widget(FluentWindow):
 
     def animate_interface(self, *_, **__):
         curr_intf = self.stackedWidget.currentWidget()
+        if isinstance(curr_intf, LazyPage):
+            curr_intf = curr_intf.load()
         effects: 'list[tuple[QWidget, QRect, QGraphicsOpacityEffect]]' = []
         all_elems: list[QWidget] = []
 
@@ -960,17 +998,7 @@ class desktop_widget(FluentWindow):
         self.hide()
 
 
-def sp_get_class_num():
-    file = filename
-    loaded_data_timeline = read_schedule_config(file)
-    assert loaded_data_timeline is not None, 'Timeline load failed: file not found or invaild format'
-    timeline = loaded_data_timeline.get('timeline')
-    assert timeline is not None, 'Timeline load failed'
-    count = 0
-    for item_name, item_time in timeline.items():
-        if item_name.startswith('a'):
-            count += 1
-    return count
+lifecycle.register('settings', desktop_widget)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,219 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+from PySide2.QtCore import QPoint, QRect, QRectF, QSize, Qt
+from PySide2.QtGui import QBrush, QColor, QIcon, QImage, QPainter, QPen, QPixmap
+from PySide2.QtSvg import QSvgRenderer
+from PySide2.QtWidgets import QGraphicsBlurEffect, QGraphicsScene
+
+import conf
+import presets
+from assets import get_img_dir
+from globals import CACHE_DIR
+
+SUBJECT_ICON_SIZE = QSize(36, 26)  # 与 widget-current-activity.ui 中按钮的 iconSize 一致
+DEFAULT_ICON = 'self_study'
+ICON_CACHE_SIZE = 64  # 最多缓存的 QIcon 数量（图标 × 缩放比例）
+ATLAS_DIR = CACHE_DIR / 'icons'
+BLUR_CACHE_SIZE = 32  # 最多缓存的模糊背景数量（颜色 × 尺寸 × 缩放比例）
+
+
+class IconCache:
+    """
+    学科图标缓存：每种缩放比例（DPR）只解析、栅格化一次全部学科 SVG，拼成一张图集，
+    之后从图集中截取并缓存 QIcon。开启 ``general.icon_disk_cache`` 时图集会按素材哈希保存到磁盘，
+    下次启动直接读取 PNG，不再解析 SVG。
+    """
+
+    def __init__(self, size: QSize = SUBJECT_ICON_SIZE, max_icons: int = ICON_CACHE_SIZE):
+        self.size = size
+        self.max_icons = max_icons
+        self._icons: 'OrderedDict[Tuple[str, float], QIcon]' = OrderedDict()
+        self._atlases: 'Dict[float, Tuple[QPixmap, Dict[str, QRect]]]' = {}
+        self._names: 'Optional[Tuple[str, ...]]' = None
+        self._digest: Optional[str] = None
+
+    @property
+    def names(self) -> 'Tuple[str, ...]':
+        """存在对应 SVG 文件的图标名"""
+        if self._names is None:
+            img_dir = get_img_dir()
+            names = sorted(set(presets.subject_icon.values()) | {DEFAULT_ICON})
+            self._names = tuple(n for n in names if (img_dir / f'{n}.svg').exists())
+            missing = set(names) - set(self._names)
+            if missing:
+                logger.warning(f'Missing subject icons, falling back to {DEFAULT_ICON}: {sorted(missing)}')
+        return self._names
+
+    def icon_name(self, subject: str) -> str:
+        name = presets.subject_icon.get(subject, DEFAULT_ICON)
+        return name if name in self.names else DEFAULT_ICON
+
+    def subject_icon(self, subject: str, dpr: float = 1.0) -> QIcon:
+        key = (self.icon_name(subject), dpr)
+        icon = self._icons.get(key)
+        if icon is not None:
+            self._icons.move_to_end(key)
+            return icon
+
+        pixmap, index = self._atlas(dpr)
+        rect = index.get(key[0])
+        if rect is not None:
+            cell = pixmap.copy(rect)
+            cell.setDevicePixelRatio(dpr)
+            icon = QIcon(cell)
+        else:
+            icon = QIcon()
+        self._icons[key] = icon
+        while len(self._icons) > self.max_icons:
+            self._icons.popitem(last=False)
+        return icon
+
+    def clear(self):
+        self._icons.clear()
+        self._atlases.clear()
+        self._names = None
+        self._digest = None
+
+    def _cell_size(self, dpr: float) -> QSize:
+        return QSize(round(self.size.width() * dpr), round(self.size.height() * dpr))
+
+    def _asset_digest(self) -> str:
+        if self._digest is None:
+            h = hashlib.sha1(f'{self.size.width()}x{self.size.height()}'.encode())
+            img_dir = get_img_dir()
+            for name in self.names:
+                h.update(name.encode())
+                h.update((img_dir / f'{name}.svg').read_bytes())
+            self._digest = h.hexdigest()[:16]
+        return self._digest
+
+    def _atlas(self, dpr: float) -> 'Tuple[QPixmap, Dict[str, QRect]]':
+        atlas = self._atlases.get(dpr)
+        if atlas is None:
+            use_disk = conf.CFG.general.icon_disk_cache
+            atlas = (self._load_atlas(dpr) if use_disk else None) or self._render_atlas(dpr)
+            if use_disk:
+                self._save_atlas(dpr, *atlas)
+            self._atlases[dpr] = atlas
+        return atlas
+
+    def _render_atlas(self, dpr: float) -> 'Tuple[QPixmap, Dict[str, QRect]]':
+        cell = self._cell_size(dpr)
+        pixmap = QPixmap(cell.width() * max(len(self.names), 1), cell.height())
+        pixmap.fill(Qt.transparent)
+        index = {}
+        img_dir = get_img_dir()
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for i, name in enumerate(self.names):
+            renderer = QSvgRenderer(str(img_dir / f'{name}.svg'))
+            # 与 QIcon 的 SVG 引擎一致：保持宽高比缩放并居中
+            fitted = renderer.defaultSize().scaled(cell, Qt.KeepAspectRatio)
+            x = i * cell.width() + (cell.width() - fitted.width()) / 2
+            y = (cell.height() - fitted.height()) / 2
+            renderer.render(painter, QRectF(x, y, fitted.width(), fitted.height()))
+            index[name] = QRect(i * cell.width(), 0, cell.width(), cell.height())
+        painter.end()
+        logger.debug(f'Rasterized {len(index)} subject icons at {dpr}x')
+        return pixmap, index
+
+    def _atlas_path(self, dpr: float):
+        return ATLAS_DIR / f'subject-icons-{self._asset_digest()}@{dpr:g}x.png'
+
+    def _load_atlas(self, dpr: float) -> 'Tuple[QPixmap, Dict[str, QRect]] | None':
+        path = self._atlas_path(dpr)
+        try:
+            if not path.exists():
+                return None
+            index = {name: QRect(*rect) for name, rect in json.loads(path.with_suffix('.json').read_text('utf-8')).items()}
+            pixmap = QPixmap(str(path))
+        except Exception as e:
+            logger.warning(f'Failed to load icon atlas {path.name}: {e}')
+            return None
+        if pixmap.isNull() or set(index) != set(self.names):
+            return None
+        logger.debug(f'Loaded subject icon atlas {path.name}')
+        return pixmap, index
+
+    def _save_atlas(self, dpr: float, pixmap: QPixmap, index: 'Dict[str, QRect]'):
+        path = self._atlas_path(dpr)
+        if path.exists():
+            return
+        try:
+            ATLAS_DIR.mkdir(parents=True, exist_ok=True)
+            for stale in ATLAS_DIR.glob(f'subject-icons-*@{dpr:g}x.*'):  # 素材变化后旧的图集不再使用
+                stale.unlink()
+            path.with_suffix('.json').write_text(json.dumps({name: [r.x(), r.y(), r.width(), r.height()] for name, r in index.items()}),
+                                                 'utf-8')
+            pixmap.save(str(path), 'PNG')
+        except Exception as e:
+            logger.warning(f'Failed to save icon atlas {path.name}: {e}')
+
+
+class BlurCache:
+    """
+    模糊背景缓存：用与 QGraphicsBlurEffect 相同的算法把纯色块离屏模糊一次，之后直接显示图片，
+    避免在半透明顶层窗口上每次重绘（包括滑动动画的每一帧）都做一次软件模糊。
+    """
+
+    def __init__(self, max_pixmaps: int = BLUR_CACHE_SIZE):
+        self.max_pixmaps = max_pixmaps
+        self._pixmaps: 'OrderedDict[tuple, Tuple[QPixmap, QPoint]]' = OrderedDict()
+
+    def background(self, color: 'Tuple[int, int, int, int]', size: QSize, radius: float,
+                   dpr: float = 1.0) -> 'Tuple[QPixmap, QPoint]':
+        """返回模糊后的图片，以及其左上角相对于色块左上角的偏移（模糊会向外扩散）"""
+        key = (color, size.width(), size.height(), radius, dpr)
+        cached = self._pixmaps.get(key)
+        if cached is not None:
+            self._pixmaps.move_to_end(key)
+            return cached
+
+        source = QRectF(0, 0, size.width(), size.height())
+        scene = QGraphicsScene()
+        item = scene.addRect(source, QPen(Qt.NoPen), QBrush(QColor(*color)))
+        effect = QGraphicsBlurEffect()
+        effect.setBlurRadius(radius)
+        item.setGraphicsEffect(effect)
+        bounds = effect.boundingRectFor(source).toAlignedRect()
+        scene.setSceneRect(QRectF(bounds))
+
+        image = QImage(round(bounds.width() * dpr), round(bounds.height() * dpr), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        scene.render(painter, QRectF(image.rect()), QRectF(bounds))
+        painter.end()
+
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(dpr)
+        cached = (pixmap, bounds.topLeft())
+        self._pixmaps[key] = cached
+        while len(self._pixmaps) > self.max_pixmaps:
+            self._pixmaps.popitem(last=False)
+        return cached
+
+    def clear(self):
+        self._pixmaps.clear()
+
+
+def parse_color(color: str, alpha: int = 255) -> 'Tuple[int, int, int, int]':
+    """把 presets.subject 中 '(r, g, b' 格式的颜色转为 (r, g, b, a)"""
+    r, g, b = (int(c) for c in color.strip('() ').split(','))
+    return r, g, b, alpha
+
+
+icons = IconCache()
+blurs = BlurCache()
+
+
+def subject_icon(subject: str, dpr: float = 1.0) -> QIcon:
+    return icons.subject_icon(subject, dpr)
+
+
+def blurred_background(color: 'Tuple[int, int, int, int]', size: QSize, radius: float, dpr: float = 1.0) -> 'Tuple[QPixmap, QPoint]':
+    return blurs.background(color, size, radius, dpr)
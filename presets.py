@@ -22,7 +22,7 @@ subject = {
     '物理': '(130, 85, 180',  # 紫
     '化学': '(84, 135, 190',  # 蓝
     '美术': '(0, 186, 255',  # 蓝
-    '音乐': '255, 101, 158',  # 红
+    '音乐': '(255, 101, 158',  # 红
     '体育': '(255, 151, 135',  # 红
     '信息技术': '(84, 135, 190',  # 蓝
     '电脑': '(84, 135, 190',  # 蓝
@@ -78,6 +78,7 @@ widget_width = {
     'widget-next-activity.ui': 290,
     'widget-countdown-custom.ui': 200,
 }
+widget_spacing = -5  # 相邻组件的间距（负数为重叠）
 
 widget_conf = {
     '当前日期': 'widget-time.ui',
@@ -196,5 +197,15 @@ def get_widget_config() -> 'list[str]':
         return default_widgets
 
 
+def layout_offsets(widgets: 'list[str]') -> 'tuple[list[int], int]':
+    """各组件相对于组件栏左端的横坐标，以及组件栏的总宽度（组件窗口与通知共用）"""
+    offsets = []
+    x = 0
+    for key in widgets:
+        offsets.append(x)
+        x += widget_width[key] + widget_spacing
+    return offsets, x - widget_spacing if widgets else 0
+
+
 if __name__ == '__main__':
     print('AL-1S')
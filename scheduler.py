@@ -0,0 +1,436 @@
+import datetime as dt
+import enum
+import heapq
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from PySide2.QtCore import QObject, Qt, QTimer
+from PySide2.QtCore import Signal as pyqtSignal
+
+import conf
+import semester
+import timetable
+from semester import DayKind
+from timetable import CompiledSchedule, Countdown, ScheduleKey, TransitionEvent, TransitionKind, seconds_of_day
+from utils import CountdownData, WeekType, calculate_countdown_from_config, get_time_offset, get_week_type
+
+RESYNC_INTERVAL = 10 * 60 * 1000  # 最长唤醒间隔（毫秒）；配置 / 课表的改动由 ConfigWatcher 推送，这里只作兜底
+PREFETCH_LEAD = 5 * 60  # 午夜前多少秒预先编译明天的课程表
+CLOCK_CHECK_INTERVAL = 60 * 1000  # 检查系统时间是否跳变的间隔（毫秒）
+EARLY_TOLERANCE = dt.timedelta(seconds=1)  # 定时器提前触发时，在此范围内视为已到唤醒时刻
+CLOCK_JUMP_THRESHOLD = 2.0  # 系统时间与单调时钟的差值变化超过此秒数视为时间跳变（手动校时、休眠恢复等）
+PREWARM_LEAD = 5  # 提前多少秒发出 transitionSoon，让订阅者（通知窗口）提前准备
+SECOND_INTERVAL = 1000  # 正常秒级刷新间隔（毫秒）
+IDLE_TICK_SLACK = 50  # 毫秒；空闲 tick 稍晚于整分钟触发，定时器略微提前也不会显示上一分钟
+
+
+class TransitionScheduler(QObject):
+    """
+    根据课程表时间线（开始时间 + 各时段时长）计算下一次活动切换的时刻，
+    只在该时刻用精确单次定时器唤醒一次，并通过信号通知订阅者，代替每个组件各自的 1 秒轮询。
+
+    上课 / 下课 / 放学事件预先放入按时间排序的堆中；每次唤醒时取出所有已到时的事件，
+    在 ``bell_catch_up`` 秒内的逐个触发（定时器迟到、系统卡顿或休眠恢复后补发），每个事件只触发一次。
+    """
+    activityChanged = pyqtSignal(str)  # 当前活动（课程名 / 课间 / 暂无课程）
+    lessonStarted = pyqtSignal(str)  # 上课，参数为课程名
+    breakStarted = pyqtSignal(str)  # 下课，参数为下一节课程名（没有则为空）
+    dayEnded = pyqtSignal()  # 今日最后一节结束（放学）
+    dayChanged = pyqtSignal(object)  # 跨天（午夜或系统时间跳变），参数为新的日期
+    transitionSoon = pyqtSignal(object)  # 下一个 TransitionEvent 将在 PREWARM_LEAD 秒内到来
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self.schedule: Optional[CompiledSchedule] = None
+        self.state = '课程表未加载'
+        self.date: Optional[dt.date] = None
+
+        self._events: 'List[TransitionEvent]' = []  # heap
+        self._events_key: Optional[ScheduleKey] = None  # 事件堆对应的课程表
+        self._dispatched = -1  # 当天已处理到的时刻（秒），不晚于此的事件不会再触发
+        self._prefetched: Optional[dt.date] = None
+        self._wall_offset = _wall_offset()
+
+        self._deadline: Optional[dt.datetime] = None  # 定时器对应的唤醒时刻，None 表示只是定期同步
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+        self.due: Optional[float] = None  # 正在分发的事件计划发生的时刻
+        self._upcoming = None  # (日期, TransitionEvent)：_soon 定时器对应的事件
+        self._announced = None
+        self._soon = QTimer(self)
+        self._soon.setSingleShot(True)
+        self._soon.setTimerType(Qt.PreciseTimer)
+        self._soon.timeout.connect(self._on_soon)
+
+        # QTimer 按单调时钟计时，系统时间跳变后需要重新计算下一次唤醒
+        self._clock_check = QTimer(self)
+        self._clock_check.setInterval(CLOCK_CHECK_INTERVAL)
+        self._clock_check.setTimerType(Qt.VeryCoarseTimer)
+        self._clock_check.timeout.connect(self._check_clock)
+
+    def start(self):
+        self.refresh()
+        self._clock_check.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._soon.stop()
+        self._clock_check.stop()
+
+    def refresh(self):
+        """重新读取课程表、广播状态并重新计算下一次唤醒；配置变化后调用"""
+        now = dt.datetime.now()
+        t = seconds_of_day(now) - get_time_offset()
+        self._update(now.date(), t)
+        self._prefetch(now)
+        self._arm(now, t)
+
+    def _check_clock(self):
+        offset = _wall_offset()
+        drift = offset - self._wall_offset
+        if abs(drift) > CLOCK_JUMP_THRESHOLD:
+            logger.warning(f'System clock jumped by {drift:+.1f}s, resynchronizing schedule')
+            self.refresh()
+
+    def _on_timeout(self):
+        now = dt.datetime.now()
+        deadline, self._deadline = self._deadline, None
+        if deadline is not None and now < deadline <= now + EARLY_TOLERANCE:
+            # the timer may fire a few milliseconds early; never evaluate before the instant it was armed for
+            now = deadline
+        t = seconds_of_day(now) - get_time_offset()
+        self._update(now.date(), t)
+        self._prefetch(now)
+        self._arm(now, t)
+
+    def _update(self, date: dt.date, t: int):
+        day_changed = date != self.date
+        previous, self.date = self.date, date
+        if day_changed:
+            # 启动时已经过去的事件不补发；之后跨天则当天的事件都可以在补发窗口内触发
+            self._dispatched = t if previous is None else -1
+            if previous is not None:
+                logger.info(f'Day changed: {previous} -> {date}')
+                self.dayChanged.emit(date)  # 订阅者可在此重置只对当天有效的设置，随后再加载新一天的课程表
+        self.schedule = timetable.get_schedule_for(date)
+        state = self.schedule.current_state(t) if self.schedule is not None else timetable.NO_LESSON
+
+        self._sync_events()
+        self._dispatch(t)
+
+        if state != self.state or day_changed:
+            self.state = state
+            self.activityChanged.emit(state)
+
+    def _sync_events(self):
+        key = self.schedule.key if self.schedule is not None else None
+        if key == self._events_key:
+            return
+        self._events_key = key
+        self._events = []
+        if self.schedule is not None:
+            # 课程表变化（换课、改时间线）后只保留尚未处理的事件，已响过的铃不会重复
+            self._events = [e for e in self.schedule.transition_events() if e.at > self._dispatched]
+            heapq.heapify(self._events)
+
+    def _dispatch(self, t: int):
+        catch_up = conf.CFG.general.bell_catch_up
+        while self._events and self._events[0].at <= t:
+            event = heapq.heappop(self._events)
+            late = t - event.at
+            if late > catch_up:
+                logger.warning(f'Skipped {event.kind.name} event at {event.at}s: {late}s late (catch-up window {catch_up}s)')
+                continue
+            if late:
+                logger.info(f'Catching up {event.kind.name} event at {event.at}s, {late}s late')
+            self._fire(event)
+        self._dispatched = max(self._dispatched, t)
+
+    def _fire(self, event: TransitionEvent):
+        # 事件计划发生的时刻（time.time()），订阅者据此计算响铃延迟
+        self.due = (dt.datetime.combine(self.date, dt.time()) + dt.timedelta(seconds=event.at + get_time_offset())).timestamp()
+        if event.kind == TransitionKind.ATTEND:
+            self.lessonStarted.emit(event.lesson)
+        elif event.kind == TransitionKind.FINISH:
+            self.breakStarted.emit(event.lesson)
+        elif event.kind == TransitionKind.DAY_END:
+            self.dayEnded.emit()
+
+    def _prefetch(self, now: dt.datetime):
+        tomorrow = now.date() + dt.timedelta(days=1)
+        if self._prefetched == tomorrow:
+            return
+        if dt.datetime.combine(tomorrow, dt.time()) - now <= dt.timedelta(seconds=PREFETCH_LEAD):
+            # 午夜切换时直接命中缓存，不必在零点读取、编译课表
+            timetable.prefetch(tomorrow)
+            self._prefetched = tomorrow
+            logger.debug(f'Prefetched schedule for {tomorrow}')
+
+    def _arm(self, now: dt.datetime, t: int):
+        offset = get_time_offset()
+        midnight = dt.datetime.combine(now.date(), dt.time())
+        next_midnight = midnight + dt.timedelta(days=1)
+        boundary = None
+        if self.schedule is not None:
+            boundary = self.schedule.index.next_boundary(t)
+
+        if boundary is not None:
+            target = midnight + dt.timedelta(seconds=boundary + offset)
+        else:
+            target = next_midnight
+
+        prefetch_at = next_midnight - dt.timedelta(seconds=PREFETCH_LEAD)
+        if self._prefetched != next_midnight.date() and now < prefetch_at < target:
+            target, boundary = prefetch_at, None
+
+        delay = int((target - now).total_seconds() * 1000)
+        if delay > RESYNC_INTERVAL:
+            delay = RESYNC_INTERVAL
+            target, boundary = None, None
+        self._deadline = target
+        self._wall_offset = _wall_offset()
+        self._timer.start(max(delay, 0))
+        logger.trace(f'Next schedule wakeup in {delay} ms (boundary={boundary})')
+        self._arm_soon(now, midnight + dt.timedelta(seconds=offset))
+
+    def _arm_soon(self, now: dt.datetime, origin: dt.datetime):
+        event = self._events[0] if self._events else None
+        if event is None or (self.date, event) == self._announced:
+            self._soon.stop()
+            return
+        at = origin + dt.timedelta(seconds=event.at)
+        if at <= now:
+            return
+        self._upcoming = (self.date, event)
+        self._soon.start(max(int((at - now).total_seconds() * 1000) - PREWARM_LEAD * 1000, 0))
+
+    def _on_soon(self):
+        self._announced = self._upcoming
+        if self._upcoming is not None:
+            self.transitionSoon.emit(self._upcoming[1])
+
+
+DAY_KIND_TEXT = {
+    DayKind.HOLIDAY: '今日放假',
+    DayKind.EXAM: '今日考试',
+}
+
+
+def _wall_offset() -> float:
+    return time.time() - time.monotonic()
+
+
+@dataclass(frozen=True)
+class ScheduleSnapshot:
+    """某一时刻所有组件需要展示的数据，由 ScheduleClock 每次计算一次后广播"""
+    time: dt.datetime
+    state: str  # 当前活动
+    countdown_label: str
+    countdown_text: str  # mm:ss
+    progress: int  # 0~100
+    next_lessons: 'Tuple[str, ...]'
+    week_type: WeekType
+    custom_countdown: 'CountdownData | None'
+    idle_until: 'dt.datetime | None' = None  # 空闲（无课）时，恢复秒级刷新的时刻
+    show_seconds: bool = True
+
+    @property
+    def date(self) -> dt.date:
+        return self.time.date()
+
+    def same_state(self, other: 'ScheduleSnapshot | None') -> bool:
+        """除秒级数据（时间、倒计时、进度）外是否一致"""
+        return (other is not None and self.date == other.date and self.state == other.state and self.next_lessons == other.next_lessons
+                and self.week_type == other.week_type and self.countdown_label == other.countdown_label
+                and self.show_seconds == other.show_seconds
+                and _countdown_days(self.custom_countdown) == _countdown_days(other.custom_countdown))
+
+
+class Change(enum.Flag):
+    """两次快照之间发生变化的数据类别；组件按自己依赖的类别订阅（见 widgets.py）"""
+    SECOND = enum.auto()  # 时间（含倒计时、进度条）
+    MINUTE = enum.auto()  # 时间的分钟部分
+    PERIOD = enum.auto()  # 当前活动、接下来的课程、倒计时标题等时段切换才会改变的数据
+    DAY = enum.auto()  # 日期、单双周、倒数日天数
+    CONFIG = enum.auto()  # 配置变化（透明度等），只由 ScheduleClock.refresh() 产生
+    ALL = SECOND | MINUTE | PERIOD | DAY | CONFIG
+
+
+def diff_snapshots(old: 'ScheduleSnapshot | None', new: ScheduleSnapshot) -> Change:
+    if old is None:
+        return Change.ALL
+    changes = Change(0)
+    if new.time != old.time:
+        changes |= Change.SECOND
+    if new.time.replace(second=0) != old.time.replace(second=0):
+        changes |= Change.MINUTE
+    if (new.state, new.next_lessons, new.countdown_label, new.show_seconds) != \
+            (old.state, old.next_lessons, old.countdown_label, old.show_seconds):
+        changes |= Change.PERIOD
+    if (new.date, new.week_type, _countdown_days(new.custom_countdown)) != \
+            (old.date, old.week_type, _countdown_days(old.custom_countdown)):
+        changes |= Change.DAY
+    return changes
+
+
+def _countdown_days(cd: 'CountdownData | None'):
+    return None if cd is None else (cd.label, cd.days)
+
+
+def idle_until(schedule: Optional[CompiledSchedule], now: dt.datetime, t: int) -> 'dt.datetime | None':
+    """当前没有时段进行、且 ``idle_lead`` 分钟内也不会开始时，返回应恢复秒级刷新的时刻，否则返回 None"""
+    general = conf.CFG.general
+    if not general.idle_mode:
+        return None
+    midnight = dt.datetime.combine(now.date(), dt.time())
+    boundary = None
+    if schedule is not None:
+        if schedule.index.period_at(t)[1] is not None:
+            return None
+        boundary = schedule.index.next_boundary(t)
+    if boundary is None:
+        return midnight + dt.timedelta(days=1)  # 今天不再有课，到午夜再按新一天的课程表判断
+    resume_at = midnight + dt.timedelta(seconds=boundary + get_time_offset() - general.idle_lead * 60)
+    return resume_at if resume_at > now else None
+
+
+def make_snapshot(now: dt.datetime) -> ScheduleSnapshot:
+    schedule = timetable.get_schedule_for(now.date())
+    t = seconds_of_day(now) - get_time_offset()
+    resume_at = idle_until(schedule, now, t)
+    show_seconds = resume_at is None or not conf.CFG.general.idle_hide_seconds
+    if schedule is None:
+        state, countdown, next_lessons = timetable.NO_LESSON, None, ()
+        day_text = DAY_KIND_TEXT.get(semester.plan_for(now).kind)
+        if day_text:
+            countdown = Countdown(day_text, 0, 100)
+    else:
+        state, countdown, next_lessons = schedule.current_state(t), schedule.countdown(t), tuple(schedule.next_lessons(t))
+    if conf.CFG.general.enable_alt_schedule:
+        week_type = get_week_type(now)
+    else:
+        week_type = WeekType.SINGLE
+    return ScheduleSnapshot(
+        time=now.replace(microsecond=0),
+        state=state,
+        countdown_label=countdown.label if countdown else '',
+        countdown_text=(countdown.text if show_seconds else countdown.minutes_text) if countdown else '',
+        progress=countdown.progress if countdown else 100,
+        next_lessons=next_lessons,
+        week_type=week_type,
+        custom_countdown=calculate_countdown_from_config(now),
+        idle_until=resume_at,
+        show_seconds=show_seconds,
+    )
+
+
+class ScheduleClock(QObject):
+    """
+    所有组件与托盘卡片共享的时钟：每次 tick 只计算一份快照并通过信号广播，组件只负责渲染。
+    秒级 tick 仅在有组件通过 acquire_seconds() 申请时运行，整分钟 tick 通过 acquire_minutes() 申请，
+    其余时间只在活动切换时 tick。``changed`` 信号同时给出与上一份快照相比变化的类别（Change）。
+    空闲（没有时段进行且短时间内不会开始）时降为每 ``idle_interval`` 秒一次，
+    并在下一时段开始前 ``idle_lead`` 分钟自动恢复秒级刷新。
+    """
+    snapshotChanged = pyqtSignal(object)  # 每个新快照
+    stateChanged = pyqtSignal(object)  # 非秒级数据有变化的快照（活动切换、日期变化等）
+    changed = pyqtSignal(object, object)  # (快照, Change)
+
+    def __init__(self, scheduler: TransitionScheduler, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self.snapshot: Optional[ScheduleSnapshot] = None
+        self._seconds_users = 0
+        self._minute_users = 0
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self.tick)
+        self._idle = False
+
+        self._resume = QTimer(self)
+        self._resume.setSingleShot(True)
+        self._resume.timeout.connect(self.tick)
+
+        scheduler.activityChanged.connect(self.tick)
+
+    def tick(self, *_):
+        snapshot = make_snapshot(dt.datetime.now())
+        state_changed = not snapshot.same_state(self.snapshot)
+        changes = diff_snapshots(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        self._reschedule()
+        self.snapshotChanged.emit(snapshot)
+        if state_changed:
+            self.stateChanged.emit(snapshot)
+        if changes:
+            self.changed.emit(snapshot, changes)
+
+    def refresh(self):
+        """配置变化后重新计算并强制广播，即使快照本身没有变化（如透明度）也让组件重新渲染"""
+        self.snapshot = make_snapshot(dt.datetime.now())
+        self._reschedule(force=True)
+        self.snapshotChanged.emit(self.snapshot)
+        self.stateChanged.emit(self.snapshot)
+        self.changed.emit(self.snapshot, Change.ALL)
+
+    def acquire_seconds(self):
+        self._seconds_users += 1
+        if self._seconds_users == 1:
+            self.tick()
+
+    def release_seconds(self):
+        self._seconds_users = max(self._seconds_users - 1, 0)
+        if self._seconds_users == 0:
+            self._reschedule(force=True)
+
+    def acquire_minutes(self):
+        self._minute_users += 1
+        if self._minute_users == 1 and self._seconds_users == 0:
+            self.tick()
+
+    def release_minutes(self):
+        self._minute_users = max(self._minute_users - 1, 0)
+        if self._minute_users == 0 and self._seconds_users == 0:
+            self._timer.stop()
+
+    def _reschedule(self, force=False):
+        """根据最新快照在秒级刷新、空闲刷新与整分钟刷新之间切换"""
+        if self._seconds_users == 0:
+            self._resume.stop()
+            if self._minute_users:
+                self._start_aligned(60)
+            else:
+                self._timer.stop()
+            return
+        resume_at = self.snapshot.idle_until if self.snapshot is not None else None
+        idle = resume_at is not None
+        if idle != self._idle:
+            logger.debug(f'Clock {"idle until " + str(resume_at) if idle else "back to full rate"}')
+            self._idle = idle
+
+        if not idle:
+            self._resume.stop()
+            if force or not self._timer.isActive() or self._timer.interval() != SECOND_INTERVAL:
+                self._timer.start(SECOND_INTERVAL)
+            return
+
+        now = dt.datetime.now()
+        self._resume.start(max(int((resume_at - now).total_seconds() * 1000), 0))
+        interval = conf.CFG.general.idle_interval
+        if self._minute_users:
+            interval = min(interval, 60) if interval > 0 else 60
+        if interval > 0:
+            self._start_aligned(interval)
+        else:
+            self._timer.stop()  # 只在活动切换（activityChanged）与恢复时刻 tick
+
+    def _start_aligned(self, interval: int):
+        # 对齐到整分钟（整 interval 秒），时间显示不会滞后
+        now = dt.datetime.now()
+        ms = (seconds_of_day(now) * 1000 + now.microsecond // 1000) % (interval * 1000)
+        self._timer.start(interval * 1000 - ms + IDLE_TICK_SLACK)
@@ -0,0 +1,156 @@
+import datetime as dt
+import enum
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+from loguru import logger
+
+import conf
+
+DEFAULT_TERM_WEEKS = 26  # 未设置学期结束日期时，日历覆盖开学后的周数
+
+
+class WeekType(enum.IntEnum):
+    SINGLE = 0
+    DOUBLE = 1
+
+
+class DayKind(enum.IntEnum):
+    REGULAR = 0  # 按当天星期几的课表上课
+    HOLIDAY = 1  # 放假，无课
+    MAKEUP = 2  # 调休补课，按另一天（星期几）的课表上课
+    EXAM = 3  # 考试，无常规课程
+
+    @property
+    def has_lessons(self) -> bool:
+        return self in (DayKind.REGULAR, DayKind.MAKEUP)
+
+
+@dataclass(frozen=True)
+class DayPlan:
+    kind: DayKind
+    weekday: int  # 按哪一天（0 = 周一）的课表上课
+    week: int  # 开学后的第几周（从 1 开始），未设置开学日期时为 0
+    week_type: WeekType
+
+
+def _week_of(date: dt.date, start: Optional[dt.date]) -> int:
+    if start is None:
+        return 0
+    return (date - start).days // 7 + 1
+
+
+def _regular_plan(date: dt.date, start: Optional[dt.date]) -> DayPlan:
+    week = _week_of(date, start)
+    week_type = WeekType.DOUBLE if start is not None and week % 2 == 0 else WeekType.SINGLE
+    return DayPlan(DayKind.REGULAR, date.weekday(), week, week_type)
+
+
+@dataclass(frozen=True)
+class SemesterCalendar:
+    """
+    编译后的学期日历：``days[i]`` 为 ``origin + i`` 天的安排，任意日期的查询都只是一次下标访问。
+    范围之外的日期按开学日期直接推算（常规课表 + 单双周）。
+    """
+    start: Optional[dt.date]
+    origin: dt.date
+    days: 'Tuple[DayPlan, ...]'
+
+    @property
+    def end(self) -> dt.date:
+        return self.origin + dt.timedelta(days=len(self.days) - 1) if self.days else self.origin
+
+    def plan_for(self, date: 'dt.date | dt.datetime') -> DayPlan:
+        if isinstance(date, dt.datetime):
+            date = date.date()
+        offset = (date - self.origin).days
+        if 0 <= offset < len(self.days):
+            return self.days[offset]
+        return _regular_plan(date, self.start)
+
+    def iter_days(self, first: Optional[dt.date] = None, last: Optional[dt.date] = None) -> 'Iterator[Tuple[dt.date, DayPlan]]':
+        """按日期顺序遍历 [first, last]（默认整个学期），用于预览、导出整学期的课表"""
+        day = first or self.start or self.origin
+        last = last or self.end
+        while day <= last:
+            yield day, self.plan_for(day)
+            day += dt.timedelta(days=1)
+
+
+def _parse_date(text: str) -> Optional[dt.date]:
+    try:
+        return dt.datetime.strptime(text.strip(), '%Y-%m-%d').date()
+    except ValueError as e:
+        logger.error(f'学期日历日期格式错误：{text!r}（{e}）')
+        return None
+
+
+def _parse_range(text: str) -> 'Tuple[dt.date, dt.date] | None':
+    first, _, last = text.partition('~')
+    first_date = _parse_date(first)
+    last_date = _parse_date(last) if last else first_date
+    if first_date is None or last_date is None:
+        return None
+    return (first_date, last_date) if first_date <= last_date else (last_date, first_date)
+
+
+def compile_calendar(date_cfg: 'conf.DateConfig') -> SemesterCalendar:
+    start = _parse_date(date_cfg.start_date) if date_cfg.start_date else None
+    end = _parse_date(date_cfg.end_date) if date_cfg.end_date else None
+
+    holidays = [r for r in map(_parse_range, date_cfg.holidays) if r is not None]
+    exams = [r for r in map(_parse_range, date_cfg.exam_days) if r is not None]
+    makeups = []
+    for text, weekday in date_cfg.makeup_days.items():
+        date = _parse_date(text)
+        if date is not None and 0 <= weekday <= 6:
+            makeups.append((date, weekday))
+        elif date is not None:
+            logger.error(f'调休补课日 {text} 的星期设置错误：{weekday}')
+
+    # 覆盖整个学期以及所有特殊日期
+    bounds = [d for r in holidays + exams for d in r] + [d for d, _ in makeups]
+    if start is not None:
+        bounds += [start, end or start + dt.timedelta(weeks=DEFAULT_TERM_WEEKS) - dt.timedelta(days=1)]
+    elif end is not None:
+        bounds.append(end)
+    if not bounds:
+        return SemesterCalendar(start, dt.date.today(), ())
+
+    origin, last = min(bounds), max(bounds)
+    days = [_regular_plan(origin + dt.timedelta(days=i), start) for i in range((last - origin).days + 1)]
+
+    for date, weekday in makeups:
+        plan = days[(date - origin).days]
+        days[(date - origin).days] = DayPlan(DayKind.MAKEUP, weekday, plan.week, plan.week_type)
+    # 考试、放假优先于调休
+    for kind, ranges in ((DayKind.EXAM, exams), (DayKind.HOLIDAY, holidays)):
+        for first, last_day in ranges:
+            for i in range((first - origin).days, (last_day - origin).days + 1):
+                days[i] = DayPlan(kind, days[i].weekday, days[i].week, days[i].week_type)
+
+    return SemesterCalendar(start, origin, tuple(days))
+
+
+def _cache_key(date_cfg: 'conf.DateConfig'):
+    return (date_cfg.start_date, date_cfg.end_date, tuple(date_cfg.holidays), tuple(date_cfg.exam_days),
+            tuple(date_cfg.makeup_days.items()))
+
+
+_calendar_key = None
+_calendar: Optional[SemesterCalendar] = None
+
+
+def get_calendar() -> SemesterCalendar:
+    """返回当前配置对应的学期日历；仅当日期相关配置改变时重新编译"""
+    global _calendar_key, _calendar
+    key = _cache_key(conf.CFG.date)
+    if _calendar is None or key != _calendar_key:
+        _calendar = compile_calendar(conf.CFG.date)
+        _calendar_key = key
+        logger.debug(f'Compiled semester calendar: {len(_calendar.days)} days from {_calendar.origin}')
+    return _calendar
+
+
+def plan_for(date: 'dt.date | dt.datetime') -> DayPlan:
+    return get_calendar().plan_for(date)
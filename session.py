@@ -0,0 +1,121 @@
+import ctypes
+import sys
+
+from loguru import logger
+from PySide2.QtCore import QAbstractNativeEventFilter, QCoreApplication, QObject
+from PySide2.QtCore import Signal as pyqtSignal
+from PySide2.QtWidgets import QWidget
+
+
+class SessionMonitor(QObject):
+    """
+    会话状态提供者：锁屏、屏幕关闭时 ``active`` 为 False，组件此时只保持数据最新，不再刷新界面。
+    默认实现不做任何检测，始终视为活动（Linux 等平台）；平台实现见 ``PROVIDERS``。
+    """
+    activeChanged = pyqtSignal(bool)
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self._locked = False
+        self._display_off = False
+
+    @property
+    def active(self) -> bool:
+        return not (self._locked or self._display_off)
+
+    def set_locked(self, locked: bool):
+        self._update(locked=locked)
+
+    def set_display_off(self, display_off: bool):
+        self._update(display_off=display_off)
+
+    def _update(self, **state):
+        was_active = self.active
+        self._locked = state.get('locked', self._locked)
+        self._display_off = state.get('display_off', self._display_off)
+        if self.active != was_active:
+            logger.debug(f'Session {"active" if self.active else "inactive"} (locked={self._locked}, display_off={self._display_off})')
+            self.activeChanged.emit(self.active)
+
+    def stop(self):
+        pass
+
+
+# Windows: WTSRegisterSessionNotification / RegisterPowerSettingNotification
+WM_WTSSESSION_CHANGE = 0x02B1
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+WM_POWERBROADCAST = 0x0218
+PBT_POWERSETTINGCHANGE = 0x8013
+DEVICE_NOTIFY_WINDOW_HANDLE = 0
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [('Data1', ctypes.c_ulong), ('Data2', ctypes.c_ushort), ('Data3', ctypes.c_ushort), ('Data4', ctypes.c_ubyte * 8)]
+
+
+class _PowerBroadcastSetting(ctypes.Structure):
+    _fields_ = [('PowerSetting', _GUID), ('DataLength', ctypes.c_ulong), ('Data', ctypes.c_ubyte * 1)]
+
+
+# GUID_CONSOLE_DISPLAY_STATE: 0 = off, 1 = on, 2 = dimmed
+GUID_CONSOLE_DISPLAY_STATE = _GUID(0x6FE69556, 0x704A, 0x47A0, (ctypes.c_ubyte * 8)(0x8F, 0x24, 0xC2, 0x8D, 0x93, 0x6F, 0xDA, 0x47))
+
+
+class _MessageFilter(QAbstractNativeEventFilter):
+
+    def __init__(self, monitor: 'WtsSessionMonitor'):
+        super().__init__()
+        self.monitor = monitor
+
+    def nativeEventFilter(self, event_type, message):
+        if event_type == 'windows_generic_MSG':
+            from ctypes import wintypes
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_WTSSESSION_CHANGE:
+                if msg.wParam == WTS_SESSION_LOCK:
+                    self.monitor.set_locked(True)
+                elif msg.wParam == WTS_SESSION_UNLOCK:
+                    self.monitor.set_locked(False)
+            elif msg.message == WM_POWERBROADCAST and msg.wParam == PBT_POWERSETTINGCHANGE:
+                setting = _PowerBroadcastSetting.from_address(msg.lParam)
+                if bytes(setting.PowerSetting) == bytes(GUID_CONSOLE_DISPLAY_STATE):
+                    self.monitor.set_display_off(setting.Data[0] == 0)
+        return False, 0
+
+
+class WtsSessionMonitor(SessionMonitor):
+    """Windows：通过一个不显示的原生窗口接收锁屏 / 解锁与显示器开关通知"""
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self._window = QWidget()  # 只用于接收消息，组件窗口重建时通知不会丢失
+        self._hwnd = int(self._window.winId())
+        self._filter = _MessageFilter(self)
+        QCoreApplication.instance().installNativeEventFilter(self._filter)
+
+        if not ctypes.windll.wtsapi32.WTSRegisterSessionNotification(self._hwnd, NOTIFY_FOR_THIS_SESSION):
+            raise ctypes.WinError()
+        self._power_notify = ctypes.windll.user32.RegisterPowerSettingNotification(
+            self._hwnd, ctypes.byref(GUID_CONSOLE_DISPLAY_STATE), DEVICE_NOTIFY_WINDOW_HANDLE)
+
+    def stop(self):
+        ctypes.windll.wtsapi32.WTSUnRegisterSessionNotification(self._hwnd)
+        if self._power_notify:
+            ctypes.windll.user32.UnregisterPowerSettingNotification(self._power_notify)
+        QCoreApplication.instance().removeNativeEventFilter(self._filter)
+
+
+PROVIDERS = {
+    'win32': WtsSessionMonitor,
+}
+
+
+def create_monitor(parent: 'QObject | None' = None) -> SessionMonitor:
+    provider = PROVIDERS.get(sys.platform, SessionMonitor)
+    try:
+        return provider(parent)
+    except Exception as e:
+        logger.warning(f'无法监听会话状态（锁屏 / 屏幕关闭），组件将始终刷新：{e}')
+        return SessionMonitor(parent)
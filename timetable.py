@@ -0,0 +1,389 @@
+import datetime as dt
+import enum
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from loguru import logger
+
+import conf
+import semester
+from utils import WeekType, get_schedule_overlay, is_temp_week, read_effective_schedule, schedule_config_revision
+
+LESSON_PREFIXES = ('am', 'aa')
+BREAK_PREFIXES = ('fm', 'fa')
+
+NO_LESSON = '暂无课程'
+BREAK = '课间'
+
+# 下午等后续时段提前 30 分钟进入倒计时 / 下一节课预告
+SESSION_LEAD = 30 * 60
+
+SESSION_ENDED_TEXT = {
+    'morning': '上午课程已结束',
+    'afternoon': '今日课程已结束',
+}
+
+
+class PeriodKind(enum.IntEnum):
+    LESSON = 0
+    BREAK = 1
+
+
+@dataclass(frozen=True)
+class Period:
+    key: str  # timeline key, e.g. 'am1' / 'fa2'
+    kind: PeriodKind
+    name: str  # resolved lesson name, or '课间' for breaks
+    start: dt.datetime
+    end: dt.datetime
+
+    @property
+    def duration(self) -> dt.timedelta:
+        return self.end - self.start
+
+    @property
+    def is_lesson(self) -> bool:
+        return self.kind == PeriodKind.LESSON
+
+
+@dataclass(frozen=True)
+class Session:
+    name: str  # 'morning' / 'afternoon'
+    start: dt.datetime
+    periods: 'Tuple[Period, ...]'
+
+    @property
+    def end(self) -> dt.datetime:
+        return self.periods[-1].end if self.periods else self.start
+
+
+class TransitionKind(enum.IntEnum):
+    # values match the ``state`` argument of ``tip_toast.main``
+    FINISH = 0
+    ATTEND = 1
+    DAY_END = 2  # 最后一节课下课（放学）
+
+
+@dataclass(frozen=True)
+class Countdown:
+    label: str
+    remaining: int  # seconds
+    progress: int  # 0~100
+
+    @property
+    def text(self) -> str:
+        minute, sec = divmod(self.remaining, 60)
+        return f'{minute:02d}:{sec:02d}'
+
+    @property
+    def minutes_text(self) -> str:
+        """不显示秒数时使用（空闲模式）"""
+        return f'{self.remaining // 60} 分钟' if self.remaining else self.text
+
+
+@dataclass(frozen=True, order=True)
+class TransitionEvent:
+    at: int  # seconds of day, schedule time (time offset not applied)
+    kind: TransitionKind
+    lesson: str = field(compare=False)  # 上课的课程 / 下课后的下一节课程
+
+
+def seconds_of_day(t: 'dt.datetime | dt.time') -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+@dataclass(frozen=True)
+class PeriodIndex:
+    """
+    按开始时间排序的时段表，所有时间均为当天零点起的秒数。
+    ``starts``/``ends``/``sessions`` 与 ``periods`` 一一对应，查询时只需一次 bisect。
+    """
+    periods: 'Tuple[Period, ...]'
+    starts: 'Tuple[int, ...]'
+    ends: 'Tuple[int, ...]'
+    sessions: 'Tuple[int, ...]'  # index into CompiledSchedule.sessions
+    activations: 'Tuple[int, ...]'  # per session: from when the session is the "active" one
+    transitions: 'Tuple[int, ...]'
+    transition_kinds: 'Tuple[TransitionKind, ...]'
+    boundaries: 'Tuple[int, ...]'  # every instant at which the current period changes
+
+    def next_boundary(self, t: int) -> Optional[int]:
+        i = bisect_right(self.boundaries, t)
+        return self.boundaries[i] if i < len(self.boundaries) else None
+
+    def period_at(self, t: int) -> 'tuple[int, Optional[Period]]':
+        """返回 (i, period)：``i`` 为最后一个开始时间不晚于 ``t`` 的时段，period 为包含 ``t`` 的时段（如有）"""
+        i = bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return i, self.periods[i]
+        return i, None
+
+    def active_session(self, t: int) -> int:
+        return max(bisect_right(self.activations, t) - 1, 0)
+
+
+def build_index(sessions: 'Tuple[Session, ...]') -> PeriodIndex:
+    rows = []
+    for session_no, session in enumerate(sessions):
+        for period in session.periods:
+            rows.append((seconds_of_day(period.start), seconds_of_day(period.end), session_no, period))
+    rows.sort(key=lambda r: r[0])
+
+    activations = []
+    for session_no, session in enumerate(sessions):
+        activations.append(seconds_of_day(session.start) - SESSION_LEAD if session_no else -1)
+
+    transitions = {}
+    for start, end, _, period in rows:
+        if period.is_lesson:
+            transitions[start] = TransitionKind.ATTEND
+            transitions[end] = TransitionKind.FINISH
+    if transitions:
+        transitions[max(transitions)] = TransitionKind.DAY_END
+    transition_times = tuple(sorted(transitions))
+
+    return PeriodIndex(
+        periods=tuple(r[3] for r in rows),
+        starts=tuple(r[0] for r in rows),
+        ends=tuple(r[1] for r in rows),
+        sessions=tuple(r[2] for r in rows),
+        activations=tuple(activations),
+        transitions=transition_times,
+        transition_kinds=tuple(transitions[t] for t in transition_times),
+        boundaries=tuple(sorted({r[0] for r in rows} | {r[1] for r in rows})),
+    )
+
+
+@dataclass(frozen=True)
+class ScheduleKey:
+    """Everything a compiled schedule depends on; a new key means a rebuild."""
+    filename: str
+    date: dt.date
+    weekday: int
+    week_type: WeekType
+    overlay: str  # JSON of the temporary swap overlay in effect, '' if none
+    revision: 'Tuple[int, int]'  # (mtime_ns, size) of the profile file
+
+
+@dataclass(frozen=True)
+class CompiledSchedule:
+    key: ScheduleKey
+    sessions: 'Tuple[Session, ...]'
+    lessons: 'Mapping[str, str]'  # timeline key -> lesson name, lessons only
+    index: PeriodIndex
+
+    @property
+    def periods(self) -> 'Tuple[Period, ...]':
+        return tuple(p for s in self.sessions for p in s.periods)
+
+    # 以下查询中的 t 均为当天零点起的秒数（已扣除时差偏移）
+
+    def current_state(self, t: int) -> str:
+        _, period = self.index.period_at(t)
+        return period.name if period is not None else NO_LESSON
+
+    def countdown(self, t: int) -> Optional[Countdown]:
+        if not self.sessions:
+            return None
+        i, period = self.index.period_at(t)
+        if period is not None:
+            remaining = self.index.ends[i] - t
+            duration = self.index.ends[i] - self.index.starts[i]
+            label = '当前活动结束还有' if period.is_lesson else '课间时长还有'
+            return Countdown(label, remaining, int(100 - remaining / duration * 100))
+
+        session = self.sessions[self.index.active_session(t)]
+        session_start = seconds_of_day(session.start)
+        if t < session_start:
+            return Countdown('距离上课还有', session_start - t, 100)
+        return Countdown(SESSION_ENDED_TEXT.get(session.name, '今日课程已结束'), 0, 100)
+
+    def next_lessons(self, t: int, limit: Optional[int] = None) -> 'list[str]':
+        """当前时段（上午 / 下午）中尚未开始的课程"""
+        if not self.sessions:
+            return []
+        session_no = self.index.active_session(t)
+        lessons = []
+        # periods are sorted by start, so a session's periods are contiguous
+        for i in range(bisect_right(self.index.starts, t), len(self.index.periods)):
+            if limit is not None and len(lessons) >= limit:
+                break
+            if self.index.sessions[i] != session_no:
+                break
+            if self.index.periods[i].is_lesson:
+                lessons.append(self.index.periods[i].name)
+        return lessons
+
+    def transition_events(self) -> 'list[TransitionEvent]':
+        """当天所有上课 / 下课 / 放学事件，按时间排序"""
+        events = []
+        for at, kind in zip(self.index.transitions, self.index.transition_kinds):
+            if kind == TransitionKind.ATTEND:
+                lesson = self.current_state(at)
+            elif kind == TransitionKind.FINISH:
+                upcoming = self.next_lessons(at, limit=1)
+                lesson = upcoming[0] if upcoming else ''
+            else:
+                lesson = ''
+            events.append(TransitionEvent(at, kind, lesson))
+        return events
+
+
+_SESSION_PREFIXES = {
+    'morning': ('start_time_m', 'am', 'fm'),
+    'afternoon': ('start_time_a', 'aa', 'fa'),
+}
+
+
+def _resolve_schedule(data: 'Mapping[str, Any]', week_type: WeekType) -> 'Mapping[str, Any]':
+    if week_type == WeekType.DOUBLE:
+        schedule = data.get('schedule_even')
+        if schedule is not None:
+            return schedule
+        logger.error('课程表文件格式错误：缺少 schedule_even 字段（双周）')
+    schedule = data.get('schedule')
+    if schedule is None:
+        raise RuntimeError('课程表文件格式错误：字段缺少或有误')
+    return schedule
+
+
+def _resolve_lessons(timeline: 'Mapping[str, Any]', day: 'Sequence[str]') -> 'dict[str, str]':
+    lessons = {}
+    class_count = 0
+    for item_name in timeline:
+        if not item_name.startswith(LESSON_PREFIXES):
+            continue
+        try:
+            name = day[class_count]
+        except IndexError:
+            name = '未添加'
+        lessons[item_name] = name if name != '未添加' else NO_LESSON
+        class_count += 1
+    return lessons
+
+
+def compile_schedule(data: 'Mapping[str, Any]', key: ScheduleKey) -> CompiledSchedule:
+    timeline = data.get('timeline')
+    if not isinstance(timeline, Mapping):
+        raise RuntimeError('课程表文件格式错误：缺少 timeline 字段或 timeline 不是字典')
+
+    schedule = _resolve_schedule(data, key.week_type)
+    lessons = _resolve_lessons(timeline, schedule.get(str(key.weekday)) or [])
+
+    sessions = []
+    for session_name, (start_key, lesson_prefix, break_prefix) in _SESSION_PREFIXES.items():
+        start_time = timeline.get(start_key)
+        if not start_time:
+            continue
+        try:
+            h, m = start_time
+            start = dt.datetime.combine(key.date, dt.time(h, m))
+        except Exception as e:
+            logger.error(f'加载课程表文件[起始时间]出错：{e}')
+            continue
+
+        periods = []
+        cursor = start
+        for item_name, item_time in timeline.items():
+            if item_name.startswith(lesson_prefix):
+                kind, name = PeriodKind.LESSON, lessons[item_name]
+            elif item_name.startswith(break_prefix):
+                kind, name = PeriodKind.BREAK, BREAK
+            else:
+                continue
+            end = cursor + dt.timedelta(minutes=int(item_time))
+            periods.append(Period(item_name, kind, name, cursor, end))
+            cursor = end
+        sessions.append(Session(session_name, start, tuple(periods)))
+
+    sessions.sort(key=lambda s: s.start)
+    return CompiledSchedule(key, tuple(sessions), MappingProxyType(lessons), build_index(tuple(sessions)))
+
+
+def make_key(filename: str, date: dt.date, weekday: int, week_type: WeekType) -> ScheduleKey:
+    if not conf.CFG.general.enable_alt_schedule:
+        week_type = WeekType.SINGLE
+    revision = schedule_config_revision(filename) or (0, 0)
+    return ScheduleKey(filename, date, weekday, week_type, overlay_key(filename, date), revision)
+
+
+_overlay_keys: 'Dict[Tuple[str, dt.date], str]' = {}
+
+
+def overlay_key(filename: str, date: dt.date) -> str:
+    """换课覆盖层在 ScheduleKey 中的部分；缓存到 temp 配置变化或跨天（invalidate_overlay）为止，tick 时不再解析、序列化"""
+    key = (filename, date)
+    text = _overlay_keys.get(key)
+    if text is None:
+        overlay = get_schedule_overlay(filename, date)
+        text = _overlay_keys[key] = overlay.model_dump_json() if overlay else ''
+    return text
+
+
+def invalidate_overlay():
+    _overlay_keys.clear()
+
+
+def revert_overlay():
+    """撤销临时换课：清除配置中的覆盖层并立即生效"""
+    conf.CFG.temp.overlay = None
+    conf.save()
+    invalidate_overlay()
+    logger.info('Reverted temporary schedule overlay')
+
+
+COMPILED_CACHE_SIZE = 2  # 今天 + 午夜前预先编译的明天
+
+_compiled: 'OrderedDict[ScheduleKey, Optional[CompiledSchedule]]' = OrderedDict()
+
+
+def get_compiled_schedule(filename: str, date: dt.date, weekday: int, week_type: WeekType) -> Optional[CompiledSchedule]:
+    """
+    返回编译后的课程表；仅当课表文件、日期、星期、单双周或换课状态改变时才重新读取并编译。
+    加载失败时返回 None（同样会被缓存，直到上述状态改变）。
+    """
+    key = make_key(filename, date, weekday, week_type)
+    if key in _compiled:
+        _compiled.move_to_end(key)
+        return _compiled[key]
+
+    compiled = None
+    data = read_effective_schedule(filename, date)
+    if data is None:
+        logger.error('加载课程表文件失败: 不符合 JSON 格式规范或文件不存在')
+    else:
+        try:
+            compiled = compile_schedule(data, key)
+            logger.debug(f'Compiled schedule {filename} for {date} (weekday {weekday}, {key.week_type.name})')
+        except Exception as e:
+            logger.error(f'编译课程表出错：{e}')
+
+    _compiled[key] = compiled
+    while len(_compiled) > COMPILED_CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return compiled
+
+
+def get_schedule_for(date: dt.date) -> Optional[CompiledSchedule]:
+    """按学期日历与当前配置（课表文件、调休）获取某天的课程表；放假、考试等没有常规课程的日子返回 None"""
+    plan = semester.plan_for(date)
+    if not plan.kind.has_lessons:
+        return None
+    temp_week = is_temp_week()
+    weekday = int(temp_week) if temp_week else plan.weekday
+    return get_compiled_schedule(conf.CFG.general.schedule, date, weekday, plan.week_type)
+
+
+def prefetch(date: dt.date) -> Optional[CompiledSchedule]:
+    """预先编译某天（通常是明天）的课程表；调休只对当天有效，跨天时会被重置，因此这里不考虑"""
+    plan = semester.plan_for(date)
+    if not plan.kind.has_lessons:
+        return None
+    return get_compiled_schedule(conf.CFG.general.schedule, date, plan.weekday, plan.week_type)
+
+
+def invalidate():
+    _compiled.clear()
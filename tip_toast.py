@@ -1,98 +1,62 @@
 import sys
-from typing import Type
+from typing import Optional, Tuple, Type
 
 from loguru import logger
-from playsound import playsound
 from PySide2.QtCore import QByteArray, QEasingCurve, QParallelAnimationGroup, QPropertyAnimation, QRect, Qt, QTimer
 from PySide2.QtWidgets import QApplication, QFrame, QLabel, QWidget
 from qfluentwidgets import setThemeColor
 from typing_extensions import TypeVar
 
+import audio
 import conf
 import presets
 from utils import assert_not_none, create_from_ui
 
-attend_class = 'audio/attend_class.wav'
-finish_class = 'audio/finish_class.wav'
-
 attend_class_p_color = '#ff8800'
 finish_class_p_color = '#5ADFAA'
 
-window_list = []  # 窗口列表
+toast_height = 125
+mini_size_x = 120  # 动画起始时窗口比完整大小窄多少
+mini_size_y = 20
+show_duration = 2000  # 通知停留时间（毫秒）
 
 T = TypeVar('T')
 
 
 class tip_toast(QWidget):
+    """
+    上下课通知窗口。整个程序只创建一次（见 ``get_toast``），之后每次通知只更新文字、样式并重新播放动画；
+    显示期间到来的通知进入队列，只保留最新的一条，重复的通知直接丢弃。
+    """
 
     def findChild(self, arg__1: Type[T], arg__2: str = ...) -> T:
         return super().findChild(arg__1, arg__2)  # type: ignore
 
-    def __init__(self, pos, width, state=1, lesson_name=''):
+    def __init__(self):
         super().__init__()
         create_from_ui("widget-toast-bar.ui", parent=self)
 
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.move(pos[0], pos[1])
-        self.resize(width, 125)
 
         # 标题
-        title = self.findChild(QLabel, 'title')
-        backgnd = self.findChild(QFrame, 'backgnd')
-        lesson = self.findChild(QLabel, 'lesson')
-        subtitle = self.findChild(QLabel, 'subtitle')
-
-        if state == 1:
-            logger.info('上课铃声显示')
-            title.setText('上课')
-            subtitle.setText('当前课程')
-            lesson.setText(lesson_name)  # 课程名
-            playsound(attend_class, block=False)
-            setThemeColor(attend_class_p_color)  # 主题色
-        elif state == 0:
-            logger.info('下课铃声显示')
-            title.setText('下课')
-            subtitle.setText('下一节')
-            lesson.setText(lesson_name)  # 课程名
-            playsound(finish_class, block=False)
-            setThemeColor(finish_class_p_color)
-        else:
-            logger.info('放学铃声显示')
-            title.setText('放学')
-            subtitle.setText('当前课程已结束')
-            lesson.setText('')  # 课程名
-            playsound(finish_class, block=False)
-            setThemeColor(finish_class_p_color)
+        self.title = self.findChild(QLabel, 'title')
+        self.backgnd = self.findChild(QFrame, 'backgnd')
+        self.lesson = self.findChild(QLabel, 'lesson')
+        self.subtitle = self.findChild(QLabel, 'subtitle')
 
-        # 设置样式表
-        if state == 1:
-            backgnd.setStyleSheet('font-weight: bold; border-radius: 8px; '
-                                  'background-color: qlineargradient('
-                                  'spread:pad, x1:0, y1:0, x2:1, y2:1,'
-                                  ' stop:0 rgba(255, 200, 150, 255), stop:1 rgba(217, 147, 107, 255)'
-                                  ');')
-        else:
-            backgnd.setStyleSheet('font-weight: bold; border-radius: 8px; '
-                                  'background-color: qlineargradient('
-                                  'spread:pad, x1:0, y1:0, x2:1, y2:1,'
-                                  ' stop:0 rgba(166, 200, 140, 255), stop:1 rgba(107, 217, 170, 255)'
-                                  ');')
-        # 设置窗口初始大小
-        mini_size_x = 120
-        mini_size_y = 20
+        self.prepared: 'Optional[Tuple[int, str]]' = None  # 当前界面上的内容 (state, lesson_name)
+        self.current: 'Optional[Tuple[int, str]]' = None  # 正在显示的通知
+        self.pending: 'Optional[Tuple[int, str]]' = None  # 等待显示的通知
 
         self.timer = QTimer(self)
         self.timer.setSingleShot(True)
-        self.timer.setInterval(2000)
+        self.timer.setInterval(show_duration)
         self.timer.timeout.connect(self.close_window)
 
         # 放大效果
         self.geometry_animation = QPropertyAnimation(self, QByteArray(b"geometry"))
         self.geometry_animation.setDuration(350)  # 动画持续时间
-        self.geometry_animation.setStartValue(
-            QRect(int(start_x + mini_size_x / 2), int(start_y + mini_size_y / 2), total_width - mini_size_x, 125 - mini_size_y))
-        self.geometry_animation.setEndValue(QRect(start_x, start_y, total_width, 125))
         self.geometry_animation.setEasingCurve(QEasingCurve.InOutCirc)
 
         # 渐显
@@ -107,17 +71,9 @@ class tip_toast(QWidget):
         self.animation_group.addAnimation(self.geometry_animation)
         self.animation_group.finished.connect(self.timer.start)
 
-        self.animation_group.start()
-
-    def close_window(self):
-        mini_size_x = 120
-        mini_size_y = 20
-        # 放大效果
+        # 关闭：缩小并渐隐
         self.geometry_animation_close = QPropertyAnimation(self, QByteArray(b"geometry"))
-        self.geometry_animation_close.setDuration(350)  # 动画持续时间
-        self.geometry_animation_close.setStartValue(QRect(start_x, start_y, total_width, 125))
-        self.geometry_animation_close.setEndValue(
-            QRect(int(start_x + mini_size_x / 2), int(start_y + mini_size_y / 2), total_width - mini_size_x, 125 - mini_size_y))
+        self.geometry_animation_close.setDuration(350)
         self.geometry_animation_close.setEasingCurve(QEasingCurve.InOutCirc)
 
         self.opacity_animation_close = QPropertyAnimation(self, QByteArray(b"windowOpacity"))
@@ -128,29 +84,118 @@ class tip_toast(QWidget):
         self.animation_group_close = QParallelAnimationGroup(self)
         self.animation_group_close.addAnimation(self.geometry_animation_close)
         self.animation_group_close.addAnimation(self.opacity_animation_close)
-        self.animation_group_close.finished.connect(self.close)
+        self.animation_group_close.finished.connect(self.on_closed)
+
+    def prepare(self, state=1, lesson_name=''):
+        """提前设置好通知内容并创建原生窗口，通知到来时只需播放动画"""
+        if self.current is not None or self.prepared == (state, lesson_name):
+            return
+        if state == 1:
+            self.title.setText('上课')
+            self.subtitle.setText('当前课程')
+            self.lesson.setText(lesson_name)  # 课程名
+        elif state == 0:
+            self.title.setText('下课')
+            self.subtitle.setText('下一节')
+            self.lesson.setText(lesson_name)  # 课程名
+        else:
+            self.title.setText('放学')
+            self.subtitle.setText('当前课程已结束')
+            self.lesson.setText('')  # 课程名
+
+        # 设置样式表
+        if state == 1:
+            self.backgnd.setStyleSheet('font-weight: bold; border-radius: 8px; '
+                                       'background-color: qlineargradient('
+                                       'spread:pad, x1:0, y1:0, x2:1, y2:1,'
+                                       ' stop:0 rgba(255, 200, 150, 255), stop:1 rgba(217, 147, 107, 255)'
+                                       ');')
+        else:
+            self.backgnd.setStyleSheet('font-weight: bold; border-radius: 8px; '
+                                       'background-color: qlineargradient('
+                                       'spread:pad, x1:0, y1:0, x2:1, y2:1,'
+                                       ' stop:0 rgba(166, 200, 140, 255), stop:1 rgba(107, 217, 170, 255)'
+                                       ');')
+        self.setGeometry(toast_geometry())
+        self.ensurePolished()
+        self.winId()  # 提前创建原生窗口
+        self.prepared = (state, lesson_name)
+
+    def notify(self, state=1, lesson_name='', due=None):
+        # 每个事件都先响铃，只有通知界面会合并
+        if state == 1:
+            logger.info('上课铃声显示')
+            audio.play('attend_class', due)
+        elif state == 0:
+            logger.info('下课铃声显示')
+            audio.play('finish_class', due)
+        else:
+            logger.info('放学铃声显示')
+            audio.play('finish_class', due)
+
+        key = (state, lesson_name)
+        if key == self.current or key == self.pending:
+            return
+        if self.current is not None:
+            if self.pending is not None:
+                logger.debug(f'Toast {self.pending} replaced by {key}')
+            self.pending = key
+            return
+        self.show_toast(state, lesson_name)
+
+    def show_toast(self, state, lesson_name):
+        self.prepare(state, lesson_name)
+        self.current = (state, lesson_name)
+        setThemeColor(attend_class_p_color if state == 1 else finish_class_p_color)  # 主题色
+
+        rect = toast_geometry()
+        mini_rect = rect.adjusted(mini_size_x // 2, mini_size_y // 2, -(mini_size_x // 2), -(mini_size_y // 2))
+        self.geometry_animation.setStartValue(mini_rect)
+        self.geometry_animation.setEndValue(rect)
+        self.geometry_animation_close.setStartValue(rect)
+        self.geometry_animation_close.setEndValue(mini_rect)
+
+        self.setWindowOpacity(0)
+        self.setGeometry(mini_rect)
+        self.show()
+        self.animation_group.start()
 
+    def close_window(self):
         self.animation_group_close.start()
 
+    def on_closed(self):
+        self.hide()
+        self.current = None
+        if self.pending is not None:
+            key, self.pending = self.pending, None
+            self.show_toast(*key)
+
+
+def toast_geometry() -> QRect:
+    screen_geometry = assert_not_none(QApplication.primaryScreen()).geometry()
+    screen_width = screen_geometry.width()
+    _, total_width = presets.layout_offsets(presets.get_widget_config())
+    return QRect(int((screen_width - total_width) / 2), conf.CFG.general.margin, total_width, toast_height)
+
+
+_toast: 'Optional[tip_toast]' = None
+
+
+def get_toast() -> tip_toast:
+    global _toast
+    if _toast is None:
+        _toast = tip_toast()
+    return _toast
+
+
+def prewarm(state=1, lesson_name=''):
+    if conf.CFG.general.enable_toast:
+        get_toast().prepare(state, lesson_name)
 
-def main(state=1, lesson_name=''):
-    global start_x, start_y, total_width
 
+def main(state=1, lesson_name='', due=None):
     if conf.CFG.general.enable_toast:
-        screen_geometry = assert_not_none(QApplication.primaryScreen()).geometry()
-        screen_width = screen_geometry.width()
-        spacing = -5
-        widgets = presets.get_widget_config()
-        total_width = total_width = sum((presets.widget_width[key] for key in widgets), spacing * (len(widgets) - 1))
-
-        start_x = int((screen_width - total_width) / 2)
-        start_y = conf.CFG.general.margin
-
-        window = tip_toast((start_x, start_y), total_width, state, lesson_name)
-        window.show()
-        window_list.append(window)
-    else:
-        return
+        get_toast().notify(state, lesson_name, due)
 
 
 if __name__ == '__main__':
@@ -1,15 +1,34 @@
-from .ui_about import Ui_About as Ui_About
-from .ui_advance import Ui_Advance as Ui_Advance
-from .ui_configs import Ui_Configs as Ui_Configs
-from .ui_countdown import Ui_Countdown as Ui_Countdown
-from .ui_countdown_custom import Ui_CountdownCustom as Ui_CountdownCustom
-from .ui_current_activity import Ui_CurrentActivity as Ui_CurrentActivity
-from .ui_custom import Ui_Custom as Ui_Custom
-from .ui_exactmenu import Ui_ExactMenu as Ui_ExactMenu
-from .ui_next_activity import Ui_NextActivity as Ui_NextActivity
-from .ui_preview import Ui_Preview as Ui_Preview
-from .ui_schedule_edit import Ui_ScheduleEdit as Ui_ScheduleEdit
-from .ui_time import Ui_Time as Ui_Time
-from .ui_timeline_edit import Ui_TimelineEdit as Ui_TimelineEdit
-from .ui_toast_bar import Ui_ToastBar as Ui_ToastBar
-from .ui_weather import Ui_Weather as Ui_Weather
+# 按需导入：常驻的组件进程只加载组件用到的界面，设置页面的模块在打开设置时才导入（PEP 562）
+import importlib
+
+_MODULES = {
+    'Ui_About': 'ui_about',
+    'Ui_Advance': 'ui_advance',
+    'Ui_Configs': 'ui_configs',
+    'Ui_Countdown': 'ui_countdown',
+    'Ui_CountdownCustom': 'ui_countdown_custom',
+    'Ui_CurrentActivity': 'ui_current_activity',
+    'Ui_Custom': 'ui_custom',
+    'Ui_ExactMenu': 'ui_exactmenu',
+    'Ui_NextActivity': 'ui_next_activity',
+    'Ui_Preview': 'ui_preview',
+    'Ui_ScheduleEdit': 'ui_schedule_edit',
+    'Ui_Time': 'ui_time',
+    'Ui_TimelineEdit': 'ui_timeline_edit',
+    'Ui_ToastBar': 'ui_toast_bar',
+    'Ui_Weather': 'ui_weather',
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_MODULES[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
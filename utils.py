@@ -1,9 +1,10 @@
-import enum
 import json
 import os
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Any
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
 
 from loguru import logger
 from PySide2.QtCore import QObject
@@ -12,10 +13,11 @@ from typing_extensions import TypeVar
 
 import conf
 import presets
+import semester
 import ui as ui_mod
 import win32lib
 from assets import get_img_dir
-from conf import CFG
+from semester import WeekType
 
 # def loadUi(ui_file: str, theme: str = "default", *, raw=False, base_instance: 'QObject | None' = None):
 #     if not raw:
@@ -57,6 +59,9 @@ def load_ui(ui_file: str, theme: str = "default", *, raw=False, base_instance: '
     return ui
 
 
+_ui_widget_classes: 'Dict[str, type]' = {}
+
+
 def create_from_ui(ui_file: str, theme: str = "default", *, raw=False, parent: 'QObject | None' = None):
     assert ui_mod is not None, f"UI package not compiled"
     assert ui_file in UI_MAPPING, f"UI file not found: {ui_file}"
@@ -78,32 +83,83 @@ def create_from_ui(ui_file: str, theme: str = "default", *, raw=False, parent: '
     #         ui.setupUi(base_instance)
     #     except (TypeError, AssertionError):
     #         ui.setupUi()
-    class TargetWidgetWithUi(QWidget, ui):
+    cls = _ui_widget_classes.get(ui_name)
+    if cls is None:  # 每个 .ui 只生成一次组合类
+        class TargetWidgetWithUi(QWidget, ui):
 
-        def __init__(self, parent=None):
-            super().__init__(parent)
-            self.setupUi(self)
+            def __init__(self, parent=None):
+                super().__init__(parent)
+                self.setupUi(self)
 
-    ui = TargetWidgetWithUi(parent)
-    return ui
+        cls = _ui_widget_classes[ui_name] = TargetWidgetWithUi
+
+    return cls(parent)
+
+
+SCHEDULE_CACHE_SIZE = 64  # 最多缓存的课表文件数量（LRU）
+
+# filename -> ((mtime_ns, size), frozen data)
+_schedule_cache: 'OrderedDict[str, Tuple[Tuple[int, int], Mapping[str, Any]]]' = OrderedDict()
+
+
+def freeze(obj: Any) -> Any:
+    """递归地把 dict / list 转为只读的 MappingProxyType / tuple，缓存中的数据可以安全地共享"""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def schedule_config_revision(filename: str) -> 'Tuple[int, int] | None':
+    try:
+        st = os.stat(f'config/schedule/{filename}')
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cache_schedule_config(filename: str, revision: 'Tuple[int, int]', data: 'Mapping[str, Any]'):
+    _schedule_cache[filename] = (revision, data)
+    _schedule_cache.move_to_end(filename)
+    while len(_schedule_cache) > SCHEDULE_CACHE_SIZE:
+        _schedule_cache.popitem(last=False)
 
 
-def read_schedule_config(filename: str) -> 'dict | None':
+def invalidate_schedule_config(filename: 'str | None' = None):
+    if filename is None:
+        _schedule_cache.clear()
+    else:
+        _schedule_cache.pop(filename, None)
+
+
+def read_schedule_config(filename: str) -> 'Mapping[str, Any] | None':
     """
-    从 JSON 文件中加载数据。
+    从 JSON 文件中加载数据。文件未变化（mtime + 大小）时直接返回缓存，只需一次 stat。
     :param filename: 要加载的文件
-    :return: 返回从文件中加载的数据字典
+    :return: 返回从文件中加载的数据（只读视图，需要修改时请先复制）
     """
+    revision = schedule_config_revision(filename)
+    cached = _schedule_cache.get(filename)
+    if revision is not None and cached is not None and cached[0] == revision:
+        _schedule_cache.move_to_end(filename)
+        return cached[1]
+
     try:
         with open(f'config/schedule/{filename}', 'r', encoding='utf-8') as file:
             data = json.load(file)
             assert isinstance(data, dict), f"Invalid data type in schedule config file: {filename}, expected dict, got {type(data)}"
-            return data
     except Exception as e:
         logger.exception(e)
         logger.error(f"Error reading schedule config file: {e}")
+        invalidate_schedule_config(filename)
         return None
 
+    frozen = freeze(data)
+    if revision is not None:
+        _cache_schedule_config(filename, revision, frozen)
+    return frozen
+
 
 def update_schedule_config(new_data: 'dict[str, Any]', filename: str):
     # 初始化 data_dict 为一个空字典
@@ -124,9 +180,18 @@ def update_schedule_config(new_data: 'dict[str, Any]', filename: str):
     try:
         with open(f'config/schedule/{filename}', 'w', encoding='utf-8') as file:
             json.dump(data_dict, file, ensure_ascii=False, indent=4)
-        return f"数据已成功保存到 config/schedule/{filename}"
     except Exception as e:
         logger.error(f"保存数据时出错: {e}")
+        invalidate_schedule_config(filename)
+        return
+
+    # write-through: 写入后直接以新的文件状态更新缓存
+    revision = schedule_config_revision(filename)
+    if revision is None:
+        invalidate_schedule_config(filename)
+    else:
+        _cache_schedule_config(filename, revision, freeze(data_dict))
+    return f"数据已成功保存到 config/schedule/{filename}"
 
 
 @dataclass
@@ -143,40 +208,26 @@ class CountdownData:
     label: str
 
 
-def calculate_countdown_from_config() -> 'CountdownData | None':
-    custom_countdown = CFG.date.countdown_date
+def calculate_countdown_from_config(now: 'datetime | None' = None) -> 'CountdownData | None':
+    now = now or datetime.now()
+    custom_countdown = conf.CFG.date.countdown_date
     # logger.debug(f"Custom countdown processing, {custom_countdown=}")
     if custom_countdown is None or custom_countdown.strip() == '':
         return None
     else:
-        label = CFG.date.cd_text_custom
+        label = conf.CFG.date.cd_text_custom
         custom_countdown = datetime.strptime(custom_countdown, '%Y-%m-%d')
-        if custom_countdown < datetime.now():
+        if custom_countdown < now:
             # return 0
             return CountdownData(0, 0, 0, 0, label)
         else:
-            cd_text = custom_countdown - datetime.now()
+            cd_text = custom_countdown - now
             # return cd_text.days
             return CountdownData(cd_text.days, cd_text.seconds // 3600, cd_text.seconds // 60 % 60, cd_text.seconds % 60, label)
 
 
-class WeekType(enum.IntEnum):
-    SINGLE = 0
-    DOUBLE = 1
-
-
-def get_week_type():  # 获取单双周
-    start_date = CFG.date.start_date
-    if start_date:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-        today = datetime.now()
-        week_num = (today - start_date).days // 7 + 1
-        if week_num % 2 == 0:
-            return WeekType.DOUBLE  # 双周
-        else:
-            return WeekType.SINGLE  # 单周
-    else:
-        return WeekType.SINGLE  # 默认单周
+def get_week_type(today: 'datetime | None' = None):  # 获取单双周
+    return semester.plan_for(today or datetime.now()).week_type
 
 
 def check_if_widget_included(widget: str):
@@ -215,7 +266,7 @@ def update_widget_config(new_data: 'dict[str, Any]'):
 
 
 def get_time_offset():  # 获取时差偏移
-    time_offset = CFG.general.time_offset
+    time_offset = conf.CFG.general.time_offset
     if time_offset is None or time_offset == '' or time_offset == '0':
         return 0
     else:
@@ -223,18 +274,46 @@ def get_time_offset():  # 获取时差偏移
 
 
 def is_temp_week():
-    if CFG.temp.set_week is None or CFG.temp.set_week == '':
+    if conf.CFG.temp.set_week is None or conf.CFG.temp.set_week == '':
         return False
     else:
-        return CFG.temp.set_week
+        return conf.CFG.temp.set_week
 
 
-def is_temp_schedule():
-    temp_schedule = CFG.temp.temp_schedule
-    if temp_schedule is None or temp_schedule == '':
-        return False
-    else:
-        return temp_schedule
+def get_schedule_overlay(filename: str, date: 'date | None' = None) -> 'conf.ScheduleOverlay | None':
+    """返回对课表 ``filename`` 在 ``date``（默认今天）有效的临时换课覆盖层"""
+    overlay = conf.CFG.temp.overlay
+    if overlay is None or overlay.profile != filename:
+        return None
+    if overlay.expires:
+        try:
+            expires = datetime.strptime(overlay.expires, '%Y-%m-%d').date()
+        except ValueError:
+            logger.error(f'临时换课的失效日期格式错误：{overlay.expires}')
+            return None
+        if (date or datetime.now().date()) > expires:
+            return None
+    return overlay
+
+
+def apply_schedule_overlay(data: 'Mapping[str, Any]', overlay: 'conf.ScheduleOverlay') -> 'Mapping[str, Any]':
+    """在内存中把覆盖层叠加到（只读的）课表数据上，未被覆盖的部分与缓存共享"""
+    merged = dict(data)
+    for field in ('schedule', 'schedule_even'):
+        days = getattr(overlay, field)
+        base = data.get(field)
+        if days and isinstance(base, Mapping):
+            merged[field] = MappingProxyType({**base, **{day: tuple(lessons) for day, lessons in days.items()}})
+    return MappingProxyType(merged)
+
+
+def read_effective_schedule(filename: str, date: 'date | None' = None) -> 'Mapping[str, Any] | None':
+    """读取课表并叠加当天有效的临时换课"""
+    data = read_schedule_config(filename)
+    overlay = get_schedule_overlay(filename, date)
+    if data is None or overlay is None:
+        return data
+    return apply_schedule_overlay(data, overlay)
 
 
 T = TypeVar("T")
@@ -0,0 +1,128 @@
+import os
+from typing import Any, Dict, Set
+
+from loguru import logger
+from PySide2.QtCore import QFileSystemWatcher, QObject, QTimer
+from PySide2.QtCore import Signal as pyqtSignal
+
+import conf
+import timetable
+from globals import CONFIG_DIR, CONFIG_PATH_JSON
+from utils import invalidate_schedule_config
+
+DEBOUNCE_INTERVAL = 200  # 毫秒；同一批连续写入（保存、原子替换）只处理一次
+
+WIDGET_CONFIG_PATH = CONFIG_DIR / 'widget.json'
+SCHEDULE_DIR = CONFIG_DIR / 'schedule'
+
+
+class ConfigWatcher(QObject):
+    """
+    监听 config.json、config/widget.json 与 config/schedule/*.json，
+    合并短时间内的多次写入后只重新加载发生变化的文件，并通过信号通知订阅者，代替轮询。
+    """
+    configChanged = pyqtSignal(str)  # config.json 中发生变化的配置段，如 'general' / 'temp'
+    scheduleChanged = pyqtSignal(str)  # 发生变化（新增 / 修改 / 删除）的课表文件名
+    widgetLayoutChanged = pyqtSignal()
+
+    def __init__(self, parent: 'QObject | None' = None):
+        super().__init__(parent)
+        self._config_path = os.path.abspath(CONFIG_PATH_JSON)
+        self._widget_path = os.path.abspath(WIDGET_CONFIG_PATH)
+        self._schedule_dir = os.path.abspath(SCHEDULE_DIR)
+
+        self._config_dump: Dict[str, Any] = {}
+        self._schedule_revisions: Dict[str, Any] = {}
+        self._pending: Set[str] = set()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_changed)
+        self._watcher.directoryChanged.connect(self._on_changed)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_INTERVAL)
+        self._debounce.timeout.connect(self._flush)
+
+    def start(self):
+        self._config_dump = conf.CFG.model_dump(mode='json')
+        self._schedule_revisions = self._scan_schedules()
+        self._watch()
+        logger.debug(f'Watching {len(self._watcher.files())} files, {len(self._watcher.directories())} directories for changes')
+
+    def stop(self):
+        self._debounce.stop()
+        self._pending.clear()
+        paths = self._watcher.files() + self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+
+    def _watch(self):
+        # 编辑器 / 部署脚本常用“写临时文件再重命名”的方式保存，原文件的监听会随之失效，需要重新添加
+        wanted = [self._config_path, self._widget_path, self._schedule_dir]
+        wanted += [os.path.join(self._schedule_dir, name) for name in self._schedule_revisions]
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        missing = [p for p in wanted if p not in watched and os.path.exists(p)]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    def _on_changed(self, path: str):
+        self._pending.add(os.path.abspath(path))
+        self._debounce.start()
+
+    def _flush(self):
+        pending, self._pending = self._pending, set()
+
+        if self._config_path in pending:
+            self._reload_config()
+
+        if self._widget_path in pending:
+            logger.debug('Widget layout config changed')
+            self.widgetLayoutChanged.emit()
+
+        if any(p == self._schedule_dir or os.path.dirname(p) == self._schedule_dir for p in pending):
+            self._reload_schedules()
+
+        self._watch()
+
+    def _reload_config(self):
+        try:
+            conf.reload()
+        except Exception as e:
+            # 写入到一半或内容不合法时保留当前配置，等待下一次写入
+            logger.error(f'重新加载配置文件失败：{e}')
+            return
+        dump = conf.CFG.model_dump(mode='json')
+        changed = [section for section, value in dump.items() if self._config_dump.get(section) != value]
+        self._config_dump = dump
+        for section in changed:
+            logger.debug(f'Config section changed: {section}')
+            self.configChanged.emit(section)
+
+    def _scan_schedules(self) -> 'Dict[str, Any]':
+        revisions = {}
+        try:
+            entries = os.scandir(self._schedule_dir)
+        except OSError:
+            return revisions
+        with entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    st = entry.stat()
+                    revisions[entry.name] = (st.st_mtime_ns, st.st_size)
+        return revisions
+
+    def _reload_schedules(self):
+        # 目录事件不区分具体文件，按 (mtime, size) 比较找出真正变化的课表
+        revisions = self._scan_schedules()
+        changed = sorted(name for name in set(revisions) | set(self._schedule_revisions)
+                         if revisions.get(name) != self._schedule_revisions.get(name))
+        self._schedule_revisions = revisions
+        if not changed:
+            return
+        timetable.invalidate()
+        for name in changed:
+            invalidate_schedule_config(name)
+            logger.debug(f'Schedule changed: {name}')
+            self.scheduleChanged.emit(name)
+
@@ -0,0 +1,237 @@
+from typing import TYPE_CHECKING, Any, Dict, Sequence, Type
+
+from PySide2.QtCore import QRect, QSize
+from PySide2.QtWidgets import QGraphicsBlurEffect, QLabel, QProgressBar, QPushButton
+
+import conf
+import pixmap_cache
+import presets
+from scheduler import Change, ScheduleSnapshot
+
+if TYPE_CHECKING:
+    from main import DesktopWidget
+
+bkg_opacity = 165  # 模糊label的透明度(0~255)
+blur_radius = 35  # 模糊半径
+
+
+class WidgetType:
+    """
+    一种组件（.ui 文件）的行为：依赖哪些数据（``depends``）、需要哪些控件（``setup``）、
+    快照下应显示什么（``view``）以及如何把单个字段应用到控件上（``apply``）。
+    ScheduleClock 只在 ``depends`` 中的数据变化时通知组件；通过 ``register`` 加入 REGISTRY。
+    """
+    path = ''
+    depends = Change.CONFIG  # 所有组件都依赖配置（背景透明度）
+
+    def setup(self, widget: 'DesktopWidget'):
+        pass
+
+    def view(self, snapshot: ScheduleSnapshot) -> 'Dict[str, Any]':
+        return {'transparent': int(conf.CFG.general.transparent or "240")}
+
+    def apply(self, widget: 'DesktopWidget', key: str, value: Any):
+        if key == 'transparent':
+            bkg = widget.findChild(QLabel, 'label')
+            bkg.setStyleSheet(f'background-color: rgba(242, 243, 245, {value}); border-radius: 8px')  # 背景透明度
+
+
+REGISTRY: 'Dict[str, WidgetType]' = {}
+
+
+def register(cls: 'Type[WidgetType]') -> 'Type[WidgetType]':
+    REGISTRY[cls.path] = cls()
+    return cls
+
+
+def get_widget_type(path: str) -> WidgetType:
+    return REGISTRY.get(path) or WidgetType()
+
+
+def get_next_lessons_text(next_lessons: 'Sequence[str]'):
+    if not next_lessons:
+        cache_text = '当前暂无课程'
+    else:
+        cache_text = ''
+        if len(next_lessons) >= 5:
+            range_time = 5
+        else:
+            range_time = len(next_lessons)
+        for i in range(range_time):
+            if range_time > 2:
+                if next_lessons[i] != '暂无课程':
+                    cache_text += f'{presets.get_subject_abbreviation(next_lessons[i])}  '  # 获取课程简称
+                else:
+                    cache_text += f'无  '
+            else:
+                if next_lessons[i] != '暂无课程':
+                    cache_text += f'{next_lessons[i]}  '
+                else:
+                    cache_text += f'暂无  '
+    return cache_text
+
+
+@register
+class DateWidget(WidgetType):  # 日期显示
+    path = 'widget-time.ui'
+    depends = Change.DAY | Change.CONFIG
+
+    def setup(self, widget):
+        widget.date_text = widget.findChild(QLabel, 'date_text')
+        widget.day_text = widget.findChild(QLabel, 'day_text')
+
+    def view(self, snapshot):
+        view = super().view(snapshot)
+        today = snapshot.date
+        view['date_text'] = f'{today.year} 年 {today.month} 月'
+        view['day_text'] = f'{today.day} 日 {presets.week[today.weekday()]}'
+        return view
+
+    def apply(self, widget, key, value):
+        if key == 'date_text':
+            widget.date_text.setText(value)
+        elif key == 'day_text':
+            widget.day_text.setText(value)
+        else:
+            super().apply(widget, key, value)
+
+
+@register
+class CountdownWidget(WidgetType):  # 活动倒计时
+    path = 'widget-countdown.ui'
+    depends = Change.SECOND | Change.PERIOD | Change.CONFIG
+
+    def setup(self, widget):
+        widget.countdown_progress_bar = widget.findChild(QProgressBar, 'progressBar')
+        widget.activity_countdown = widget.findChild(QLabel, 'activity_countdown')
+        widget.ac_title = widget.findChild(QLabel, 'activity_countdown_title')
+
+    def view(self, snapshot):
+        view = super().view(snapshot)
+        if snapshot.countdown_label:
+            view['countdown_title'] = snapshot.countdown_label
+            view['countdown_text'] = snapshot.countdown_text
+            view['progress'] = snapshot.progress
+        view['animate'] = snapshot.idle_until is None  # 空闲时停止进度条动画
+        return view
+
+    def apply(self, widget, key, value):
+        if key == 'countdown_title':
+            widget.ac_title.setText(value)
+        elif key == 'countdown_text':
+            widget.activity_countdown.setText(value)
+        elif key == 'progress':
+            widget.countdown_progress_bar.setValue(value)
+        elif key == 'animate':
+            widget.countdown_progress_bar.setUseAni(value)
+        else:
+            super().apply(widget, key, value)
+
+
+@register
+class CurrentActivityWidget(WidgetType):  # 当前活动
+    path = 'widget-current-activity.ui'
+    depends = Change.PERIOD | Change.CONFIG
+
+    def setup(self, widget):
+        widget.current_state_text = widget.findChild(QPushButton, 'subject')
+        widget.blur_effect_label = widget.findChild(QLabel, 'blurEffect')
+        widget.blur_geometry = widget.blur_effect_label.geometry()  # 色块的位置与大小
+        widget.blur_effect = None
+        widget.live_blur = None  # 由 apply('blur') 按配置设置
+        widget.current_state_text.clicked.connect(widget.open_exact_menu)
+
+    def view(self, snapshot):
+        view = super().view(snapshot)
+        view['state'] = snapshot.state
+        # 空闲时即使开启了 live_blur 也改用预先模糊好的图片，避免每次重绘都实时模糊
+        live = conf.CFG.general.live_blur and snapshot.idle_until is None
+        view['blur'] = (live, presets.subject_color(snapshot.state))
+        return view
+
+    def apply(self, widget, key, value):
+        if key == 'state':  # 实时活动
+            widget.current_state_text.setText(f'  {value}')
+            widget.current_state_text.setIcon(pixmap_cache.subject_icon(value, widget.devicePixelRatioF()))
+        elif key == 'blur':
+            live, color = value
+            self.set_blur_mode(widget, live)
+            self.set_blur_color(widget, color)
+        else:
+            super().apply(widget, key, value)
+
+    @staticmethod
+    def set_blur_mode(widget: 'DesktopWidget', live: bool):
+        # 模糊效果：默认显示预先模糊好的图片，live_blur 时使用实时的 QGraphicsBlurEffect
+        if live == widget.live_blur:
+            return
+        widget.live_blur = live
+        label = widget.blur_effect_label
+        if live:
+            widget.blur_effect = QGraphicsBlurEffect()
+            widget.blur_effect.setBlurRadius(blur_radius)
+            label.setGraphicsEffect(widget.blur_effect)
+            label.clear()
+            label.setGeometry(widget.blur_geometry)
+        else:
+            label.setGraphicsEffect(None)
+            widget.blur_effect = None
+            label.setStyleSheet('background: transparent')
+
+    @staticmethod
+    def set_blur_color(widget: 'DesktopWidget', color: str):
+        if widget.live_blur:
+            widget.blur_effect_label.setStyleSheet(f'background-color: rgba{color}, {bkg_opacity});')
+            return
+        dpr = widget.devicePixelRatioF()
+        pixmap, offset = pixmap_cache.blurred_background(pixmap_cache.parse_color(color, bkg_opacity), widget.blur_geometry.size(), blur_radius, dpr)
+        # 模糊会向色块外扩散，标签需要扩大到整张图片的范围
+        widget.blur_effect_label.setGeometry(QRect(widget.blur_geometry.topLeft() + offset,
+                                                   QSize(round(pixmap.width() / dpr), round(pixmap.height() / dpr))))
+        widget.blur_effect_label.setPixmap(pixmap)
+
+
+@register
+class NextActivityWidget(WidgetType):  # 接下来的活动
+    path = 'widget-next-activity.ui'
+    depends = Change.PERIOD | Change.CONFIG
+
+    def setup(self, widget):
+        widget.nl_text = widget.findChild(QLabel, 'next_lesson_text')
+
+    def view(self, snapshot):
+        view = super().view(snapshot)
+        view['next_lessons'] = get_next_lessons_text(snapshot.next_lessons)
+        return view
+
+    def apply(self, widget, key, value):
+        if key == 'next_lessons':
+            widget.nl_text.setText(value)
+        else:
+            super().apply(widget, key, value)
+
+
+@register
+class CustomCountdownWidget(WidgetType):  # 自定义倒计时
+    path = 'widget-countdown-custom.ui'
+    depends = Change.DAY | Change.CONFIG
+
+    def setup(self, widget):
+        widget.custom_title = widget.findChild(QLabel, 'countdown_custom_title')
+        widget.custom_countdown = widget.findChild(QLabel, 'custom_countdown')
+
+    def view(self, snapshot):
+        view = super().view(snapshot)
+        cd_data = snapshot.custom_countdown
+        if cd_data:
+            view['custom_countdown'] = (f'距离 {cd_data.label} 还有', f"{cd_data.days} 天")
+        else:
+            view['custom_countdown'] = ('未设置倒数日', '-')
+        return view
+
+    def apply(self, widget, key, value):
+        if key == 'custom_countdown':
+            widget.custom_title.setText(value[0])
+            widget.custom_countdown.setText(value[1])
+        else:
+            super().apply(widget, key, value)